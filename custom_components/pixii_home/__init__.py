@@ -1,45 +1,184 @@
 from homeassistant.config_entries import ConfigEntry
 from homeassistant.const import CONF_HOST, CONF_PORT
-from homeassistant.core import HomeAssistant
-from homeassistant.exceptions import ConfigEntryNotReady
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers import device_registry as dr, entity_registry as er
+from homeassistant.helpers.storage import Store
 from homeassistant.helpers.update_coordinator import DataUpdateCoordinator, UpdateFailed
 from datetime import timedelta
 import logging
 import json
 
-from .const import DOMAIN, CONF_POLL_INTERVAL
+from .capture import CaptureWriter
+from .connection import Backoff, ConnectionPool
+from .const import (
+    DOMAIN,
+    CAPTURE_BACKUPS,
+    CAPTURE_DIR,
+    CAPTURE_MAX_BYTES,
+    CONF_CAPTURE,
+    CONF_PROXY,
+    CONF_PROXY_HOST,
+    CONF_PROXY_MAX_AGE,
+    CONF_PROXY_PORT,
+    CONF_PROXY_WRITES,
+    CONF_TRANSPORT,
+    CONF_UNIT_IDS,
+    DATA_CONNECTIONS,
+    DATA_PROXIES,
+    DEFAULT_PROXY_HOST,
+    DEFAULT_PROXY_MAX_AGE,
+    DEFAULT_PROXY_PORT,
+    DEFAULT_TRANSPORT,
+    DEFAULT_UNIT_ID,
+    ENERGY_STORAGE_KEY,
+    ENERGY_STORAGE_VERSION,
+    GATEWAY_MAX_IN_FLIGHT,
+    MODBUS_TIMEOUT,
+    RECONNECT_MAX_DELAY,
+    RECONNECT_MIN_DELAY,
+    TRANSPORT_NATIVE,
+)
+from .proxy import ModbusProxy
+from .services import async_setup_services, async_unload_services
 from .sunspec_reader import SunSpecReader
 from .sensor import PixiiHomeDataCoordinator
 
 _LOGGER = logging.getLogger(__name__)
 
+PLATFORMS = ["sensor", "number", "select"]
+
 async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     """Set up Pixii Home from a config entry."""
     host = entry.data[CONF_HOST]
     port = entry.data[CONF_PORT]
-    poll_interval = entry.data[CONF_POLL_INTERVAL]
+    options = {**entry.data, **entry.options}
+    transport = entry.data.get(CONF_TRANSPORT, DEFAULT_TRANSPORT)
+
+    unit_ids = entry.data.get(CONF_UNIT_IDS, [DEFAULT_UNIT_ID])
 
-    reader = SunSpecReader(hass, host, port)
+    # All units behind the gateway, also those of other config entries, share one connection
+    client = None
+    if transport == TRANSPORT_NATIVE:
+        pool = hass.data.setdefault(DATA_CONNECTIONS, ConnectionPool())
+        client = pool.acquire(
+            host, port, MODBUS_TIMEOUT, GATEWAY_MAX_IN_FLIGHT, Backoff(RECONNECT_MIN_DELAY, RECONNECT_MAX_DELAY)
+        )
 
+    coordinators = {}
     try:
-        await reader.async_initialize()
-    except Exception as err:
-        raise ConfigEntryNotReady(f"Failed to connect to Pixii Home: {err}") from err
+        for unit_id in unit_ids:
+            capture = None
+            if options.get(CONF_CAPTURE, False):
+                capture = CaptureWriter(
+                    hass.config.path(CAPTURE_DIR, f"{entry.entry_id}_{unit_id}.bin"),
+                    unit_id,
+                    CAPTURE_MAX_BYTES,
+                    CAPTURE_BACKUPS,
+                )
+            reader = SunSpecReader(
+                hass, host, port, entry.entry_id, transport, unit_id=unit_id, client=client, capture=capture
+            )
+            coordinator = PixiiHomeDataCoordinator(hass, reader, options)
+            await coordinator.async_load_energy()
+            coordinators[unit_id] = coordinator
 
-    coordinator = PixiiHomeDataCoordinator(hass, reader, poll_interval)
+        hass.data.setdefault(DOMAIN, {})
+        hass.data[DOMAIN][entry.entry_id] = coordinators
 
-    # Fetch initial data so we have data when entities subscribe
-    await coordinator.async_config_entry_first_refresh()
+        if options.get(CONF_PROXY, False) and transport != TRANSPORT_NATIVE:
+            _LOGGER.warning("The Modbus TCP proxy needs the native Modbus transport and is not started")
+        elif options.get(CONF_PROXY, False):
+            proxy = ModbusProxy(
+                client,
+                {unit_id: coordinator.reader for unit_id, coordinator in coordinators.items()},
+                options.get(CONF_PROXY_MAX_AGE, DEFAULT_PROXY_MAX_AGE),
+                options.get(CONF_PROXY_WRITES, False),
+            )
+            proxy_host = options.get(CONF_PROXY_HOST, DEFAULT_PROXY_HOST)
+            proxy_port = options.get(CONF_PROXY_PORT, DEFAULT_PROXY_PORT)
+            try:
+                await proxy.async_start(proxy_host, proxy_port)
+            except OSError as err:
+                _LOGGER.error("Unable to start the Modbus TCP proxy on %s:%s: %s", proxy_host, proxy_port, err)
+            else:
+                hass.data.setdefault(DATA_PROXIES, {})[entry.entry_id] = proxy
 
-    hass.data.setdefault(DOMAIN, {})
-    hass.data[DOMAIN][entry.entry_id] = coordinator
+        # Entities start with their restored state
+        await hass.config_entries.async_forward_entry_setups(entry, PLATFORMS)
+        entry.async_on_unload(entry.add_update_listener(async_reload_entry))
+        async_setup_services(hass)
+    except Exception:
+        # A failed setup is not unloaded, so release what was set up so far
+        if (proxy := hass.data.get(DATA_PROXIES, {}).pop(entry.entry_id, None)) is not None:
+            await proxy.async_stop()
+        hass.data.get(DOMAIN, {}).pop(entry.entry_id, None)
+        for coordinator in coordinators.values():
+            await coordinator.reader.async_close()
+        if client is not None:
+            await pool.async_release(client)
+        raise
 
-    await hass.config_entries.async_forward_entry_setups(entry, ["sensor"])
+    # The first refresh connects and restores or scans the model layout in the background,
+    # so a slow or offline gateway never delays Home Assistant startup
+    for unit_id, coordinator in coordinators.items():
+        first_refresh = hass.async_create_background_task(
+            coordinator.async_refresh(), f"{DOMAIN} first refresh {entry.entry_id} unit {unit_id}"
+        )
+        entry.async_on_unload(first_refresh.cancel)
 
     return True
 
+async def async_migrate_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
+    """Migrate an entry of a single unit to the per unit entity and device identifiers."""
+    if entry.version == 1:
+        unit_key = f"{entry.entry_id}_{DEFAULT_UNIT_ID}"
+        old_prefix = f"{DOMAIN}_"
+
+        @callback
+        def _migrate_unique_id(entity_entry: er.RegistryEntry):
+            if entity_entry.unique_id.startswith(f"{old_prefix}{unit_key}_"):
+                return None
+            return {"new_unique_id": f"{old_prefix}{unit_key}_{entity_entry.unique_id[len(old_prefix):]}"}
+
+        await er.async_migrate_entries(hass, entry.entry_id, _migrate_unique_id)
+
+        device_registry = dr.async_get(hass)
+        device = device_registry.async_get_device(identifiers={(DOMAIN, entry.entry_id)})
+        if device is not None:
+            device_registry.async_update_device(device.id, new_identifiers={(DOMAIN, unit_key)})
+
+        hass.config_entries.async_update_entry(
+            entry, data={**entry.data, CONF_UNIT_IDS: [DEFAULT_UNIT_ID]}, version=2
+        )
+        _LOGGER.info("Migrated Pixii Home entry %s to version 2", entry.entry_id)
+
+    return True
+
+async def async_reload_entry(hass: HomeAssistant, entry: ConfigEntry) -> None:
+    """Reload the config entry when its options change."""
+    await hass.config_entries.async_reload(entry.entry_id)
+
 async def async_unload_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     """Unload a config entry."""
     if unload_ok := await hass.config_entries.async_unload_platforms(entry, PLATFORMS):
-        hass.data[DOMAIN].pop(entry.entry_id)
-    return unload_ok
\ No newline at end of file
+        # The proxy forwards over the shared client, so it stops before the client is released
+        if (proxy := hass.data.get(DATA_PROXIES, {}).pop(entry.entry_id, None)) is not None:
+            await proxy.async_stop()
+        coordinators = hass.data[DOMAIN].pop(entry.entry_id)
+        for coordinator in coordinators.values():
+            await coordinator.async_save_energy()
+            await coordinator.reader.async_close()
+        if entry.data.get(CONF_TRANSPORT, DEFAULT_TRANSPORT) == TRANSPORT_NATIVE:
+            reader = next(iter(coordinators.values())).reader
+            await hass.data[DATA_CONNECTIONS].async_release(reader.client)
+        if not hass.data[DOMAIN]:
+            async_unload_services(hass)
+    return unload_ok
+
+async def async_remove_entry(hass: HomeAssistant, entry: ConfigEntry) -> None:
+    """Remove the cached model layouts and energy totals of a deleted config entry."""
+    for unit_id in entry.data.get(CONF_UNIT_IDS, [DEFAULT_UNIT_ID]):
+        reader = SunSpecReader(hass, entry.data[CONF_HOST], entry.data[CONF_PORT], entry.entry_id, unit_id=unit_id)
+        await reader.async_remove_layout()
+        suffix = f".{unit_id}" if unit_id != DEFAULT_UNIT_ID else ""
+        await Store(hass, ENERGY_STORAGE_VERSION, f"{ENERGY_STORAGE_KEY}.{entry.entry_id}{suffix}").async_remove()
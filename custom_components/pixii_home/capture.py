@@ -0,0 +1,219 @@
+"""Capture and replay of raw SunSpec register blocks for Pixii Home."""
+from __future__ import annotations
+
+import mmap
+import os
+import struct
+from typing import Callable, Iterator, Optional, Sequence
+
+from .modbus_tcp import FUNC_READ_HOLDING_REGISTERS, FUNC_WRITE_MULTIPLE_REGISTERS, ModbusExceptionResponse
+
+# File header: magic, format version and unit ID
+CAPTURE_MAGIC = b"PXRC"
+CAPTURE_VERSION = 1
+FILE_HEADER = struct.Struct(">4sBB2x")
+
+# Record header: size of the blocks that follow, wall clock time of the poll and number of blocks
+RECORD_HEADER = struct.Struct(">IdH")
+
+# Block header: first register address and register count, followed by the raw registers
+BLOCK_HEADER = struct.Struct(">HH")
+
+# Unchanged registers between two changed ones that are stored anyway instead of starting another block
+MERGE_GAP = 2
+
+ILLEGAL_DATA_ADDRESS = 0x02
+
+Blocks = Sequence[tuple[int, bytes]]
+
+def _encode_record(timestamp: float, blocks: Blocks) -> bytes:
+    """Encode the register blocks of one poll."""
+    body = b"".join(BLOCK_HEADER.pack(address, len(data) // 2) + data for address, data in blocks)
+    return RECORD_HEADER.pack(len(body), timestamp, len(blocks)) + body
+
+def capture_files(path: str) -> list[str]:
+    """Return the files of a capture, oldest rotated file first."""
+    files = []
+    index = 1
+    while os.path.exists(f"{path}.{index}"):
+        files.append(f"{path}.{index}")
+        index += 1
+    files.reverse()
+    if os.path.exists(path):
+        files.append(path)
+    return files
+
+class CaptureWriter:
+    """Rotating, size-capped, append-only log of the raw register blocks of each poll.
+
+    Every file starts with a keyframe holding the SunSpec marker, the model
+    headers and the whole register image, so each file can be replayed on
+    its own. The records after it only hold the registers that changed since
+    they were last captured, which keeps a record of a steady poll at a few
+    dozen bytes.
+    Records are buffered on the event loop and written by write() in the
+    executor. A new file is started for every writer and whenever the
+    current one would grow beyond max_bytes, keeping the given number of
+    rotated files.
+    """
+
+    def __init__(self, path: str, unit_id: int, max_bytes: int, backups: int):
+        """Initialize."""
+        self.path = path
+        self.unit_id = unit_id
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self.pending_bytes = 0
+        self.records = 0
+        self._size: Optional[int] = None
+        self._pending: list[tuple[bool, bytes]] = []
+        self._shadow = bytearray(0x10000 * 2)
+
+    def append(self, timestamp: float, blocks: Blocks, keyframe: Callable[[], Blocks]) -> None:
+        """Buffer the blocks of a poll, starting a new file with a keyframe when needed."""
+        record = _encode_record(timestamp, self._changes(blocks))
+        if self._size is None or self._size + len(record) > self.max_bytes:
+            # The keyframe already holds the registers of this poll
+            blocks = keyframe()
+            self._changes(blocks)
+            record = FILE_HEADER.pack(CAPTURE_MAGIC, CAPTURE_VERSION, self.unit_id) + _encode_record(
+                timestamp, blocks
+            )
+            self._pending.append((True, record))
+            self._size = len(record)
+        else:
+            self._pending.append((False, record))
+            self._size += len(record)
+        self.pending_bytes += len(record)
+        self.records += 1
+
+    def _changes(self, blocks: Blocks) -> list[tuple[int, bytes]]:
+        """Return the runs of registers that differ from the captured ones, and remember the new values."""
+        changes = []
+        shadow = self._shadow
+        for address, data in blocks:
+            offset = address * 2
+            if shadow[offset:offset + len(data)] == data:
+                continue
+            run_start = run_end = None
+            for index in range(0, len(data), 2):
+                if data[index:index + 2] != shadow[offset + index:offset + index + 2]:
+                    if run_start is None:
+                        run_start = index
+                    run_end = index + 2
+                elif run_start is not None and index - run_end >= MERGE_GAP * 2:
+                    changes.append((address + run_start // 2, data[run_start:run_end]))
+                    run_start = None
+            if run_start is not None:
+                changes.append((address + run_start // 2, data[run_start:run_end]))
+            shadow[offset:offset + len(data)] = data
+        return changes
+
+    def take(self) -> list[tuple[bool, bytes]]:
+        """Return and clear the buffered records, to be passed to write()."""
+        pending, self._pending = self._pending, []
+        self.pending_bytes = 0
+        return pending
+
+    def write(self, pending: list[tuple[bool, bytes]]) -> None:
+        """Append buffered records to the log, rotating files as planned by append()."""
+        file = None
+        try:
+            for new_file, data in pending:
+                if new_file or file is None:
+                    if file is not None:
+                        file.close()
+                    if new_file:
+                        self._rotate()
+                    file = open(self.path, "wb" if new_file else "ab")
+                file.write(data)
+        finally:
+            if file is not None:
+                file.close()
+
+    def _rotate(self) -> None:
+        """Move the current file to the first backup, dropping the oldest one."""
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        if not os.path.exists(self.path):
+            return
+        for index in range(self.backups - 1, 0, -1):
+            if os.path.exists(f"{self.path}.{index}"):
+                os.replace(f"{self.path}.{index}", f"{self.path}.{index + 1}")
+        if self.backups > 0:
+            os.replace(self.path, f"{self.path}.1")
+
+def read_capture(path: str) -> Iterator[tuple[float, list[tuple[int, bytes]]]]:
+    """Yield the (timestamp, blocks) records of one capture file, read through a memory map.
+
+    A record cut short by a crash while it was appended ends the file.
+    """
+    with open(path, "rb") as file:
+        if os.fstat(file.fileno()).st_size < FILE_HEADER.size:
+            return
+        with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            magic, version, _unit_id = FILE_HEADER.unpack_from(data)
+            if magic != CAPTURE_MAGIC or version != CAPTURE_VERSION:
+                raise ValueError(f"{path} is not a Pixii Home capture")
+            offset = FILE_HEADER.size
+            while offset + RECORD_HEADER.size <= len(data):
+                size, timestamp, count = RECORD_HEADER.unpack_from(data, offset)
+                offset += RECORD_HEADER.size
+                end = offset + size
+                if end > len(data):
+                    return
+                blocks = []
+                for _ in range(count):
+                    address, registers = BLOCK_HEADER.unpack_from(data, offset)
+                    offset += BLOCK_HEADER.size
+                    blocks.append((address, data[offset:offset + registers * 2]))
+                    offset += registers * 2
+                offset = end
+                yield timestamp, blocks
+
+class ReplayClient:
+    """Modbus client answering reads from a captured log, in place of ModbusTcpClient.
+
+    The registers start out unknown and every advance() applies the next
+    record of the capture. Reads of registers that were never captured fail
+    like reads of unmapped registers on a device, and writes are refused.
+    """
+
+    def __init__(self, path: str):
+        """Initialize."""
+        self.host = path
+        self.port = 0
+        self.connection_count = 1
+        self.connected = False
+        self.timestamp: Optional[float] = None
+        self._registers = bytearray(0x10000 * 2)
+        self._known = bytearray(0x10000)
+        self._records = (record for file in capture_files(path) for record in read_capture(file))
+
+    def advance(self) -> Optional[float]:
+        """Apply the next record and return its timestamp, or None at the end of the capture."""
+        record = next(self._records, None)
+        if record is None:
+            return None
+        self.timestamp, blocks = record
+        for address, data in blocks:
+            self._registers[address * 2:address * 2 + len(data)] = data
+            self._known[address:address + len(data) // 2] = b"\1" * (len(data) // 2)
+        return self.timestamp
+
+    async def async_connect(self) -> None:
+        """Connect, replays are always available."""
+        self.connected = True
+
+    async def async_close(self) -> None:
+        """Disconnect."""
+        self.connected = False
+
+    async def async_read_holding_registers(self, address: int, count: int, unit_id: int = 1) -> bytes:
+        """Return captured registers."""
+        if address + count > 0x10000 or 0 in self._known[address:address + count]:
+            raise ModbusExceptionResponse(FUNC_READ_HOLDING_REGISTERS, ILLEGAL_DATA_ADDRESS)
+        return bytes(self._registers[address * 2:(address + count) * 2])
+
+    async def async_write_registers(self, address: int, data: bytes, unit_id: int = 1) -> None:
+        """Refuse writes, a replay is read only."""
+        raise ModbusExceptionResponse(FUNC_WRITE_MULTIPLE_REGISTERS, ILLEGAL_DATA_ADDRESS)
@@ -0,0 +1,69 @@
+"""Prioritized, coalescing queue of register writes for Pixii Home."""
+from __future__ import annotations
+
+import asyncio
+from typing import NamedTuple
+
+from .modbus_tcp import MAX_WRITE_COUNT
+
+# Lower values are written first
+PRIORITY_HIGH = 0
+PRIORITY_NORMAL = 1
+
+class RegisterWrite(NamedTuple):
+    """One Modbus write request, covering the queued writes of adjacent registers."""
+
+    start: int
+    data: bytes
+    futures: tuple[asyncio.Future, ...]
+
+    @property
+    def count(self) -> int:
+        """Return the number of registers written."""
+        return len(self.data) // 2
+
+class CommandQueue:
+    """Register writes waiting for the device connection.
+
+    A write to a register that is still pending replaces the queued value, so
+    only the latest value is sent and all callers get the outcome of that
+    write. Writes are sent in priority order, and writes of the same priority
+    to adjacent registers are merged into a single request.
+    """
+
+    def __init__(self):
+        """Initialize."""
+        self._pending: dict[int, tuple[int, bytes, asyncio.Future]] = {}
+
+    def __len__(self) -> int:
+        """Return the number of pending writes."""
+        return len(self._pending)
+
+    def put(self, address: int, data: bytes, priority: int = PRIORITY_NORMAL) -> asyncio.Future:
+        """Queue a write and return a future resolved once it was written and read back."""
+        pending = self._pending.get(address)
+        if pending is not None:
+            self._pending[address] = (min(priority, pending[0]), data, pending[2])
+            return pending[2]
+        future = asyncio.get_running_loop().create_future()
+        self._pending[address] = (priority, data, future)
+        return future
+
+    def take(self) -> list[RegisterWrite]:
+        """Remove all pending writes, merged into requests in the order they are to be sent."""
+        writes: list[RegisterWrite] = []
+        last_priority = None
+        for address, (priority, data, future) in sorted(self._pending.items(), key=lambda item: (item[1][0], item[0])):
+            if (
+                writes
+                and priority == last_priority
+                and writes[-1].start + writes[-1].count == address
+                and writes[-1].count + len(data) // 2 <= MAX_WRITE_COUNT
+            ):
+                last = writes[-1]
+                writes[-1] = RegisterWrite(last.start, last.data + data, last.futures + (future,))
+            else:
+                writes.append(RegisterWrite(address, data, (future,)))
+            last_priority = priority
+        self._pending.clear()
+        return writes
@@ -1,53 +1,355 @@
 """Config flow for Pixii Home integration."""
 from __future__ import annotations
 
+import ipaddress
+import logging
+
 import voluptuous as vol
 from homeassistant import config_entries
+from homeassistant.components.network import async_get_source_ip
 from homeassistant.const import CONF_HOST, CONF_PORT
-from homeassistant.core import HomeAssistant
+from homeassistant.core import HomeAssistant, callback
 from homeassistant.data_entry_flow import FlowResult
 from homeassistant.exceptions import HomeAssistantError
 
-from .const import DOMAIN, CONF_POLL_INTERVAL
-from .sunspec_reader import SunSpecReader
+from .const import (
+    DOMAIN,
+    CONF_POLL_INTERVAL,
+    CONF_MEDIUM_POLL_INTERVAL,
+    CONF_SLOW_POLL_INTERVAL,
+    CONF_TRANSPORT,
+    CONF_UNIT_IDS,
+    CONF_NETWORK,
+    CONF_POWER_DEADBAND,
+    CONF_SOC_DEADBAND,
+    CONF_TEMPERATURE_DEADBAND,
+    CONF_RELATIVE_DEADBAND,
+    CONF_MAX_SILENCE,
+    CONF_EXPANDED_POINTS,
+    CONF_SAMPLING,
+    CONF_AGGREGATE_INTERVAL,
+    CONF_ADAPTIVE_POLLING,
+    CONF_MIN_POLL_INTERVAL,
+    CONF_MAX_POLL_INTERVAL,
+    CONF_PROXY,
+    CONF_PROXY_HOST,
+    CONF_PROXY_PORT,
+    CONF_PROXY_MAX_AGE,
+    CONF_PROXY_WRITES,
+    CONF_CAPTURE,
+    DEFAULT_PORT,
+    DEFAULT_POLL_INTERVAL,
+    DEFAULT_MEDIUM_POLL_INTERVAL,
+    DEFAULT_SLOW_POLL_INTERVAL,
+    DEFAULT_POWER_DEADBAND,
+    DEFAULT_SOC_DEADBAND,
+    DEFAULT_TEMPERATURE_DEADBAND,
+    DEFAULT_RELATIVE_DEADBAND,
+    DEFAULT_MAX_SILENCE,
+    DEFAULT_AGGREGATE_INTERVAL,
+    DEFAULT_MIN_POLL_INTERVAL,
+    DEFAULT_MAX_POLL_INTERVAL,
+    DEFAULT_PROXY_HOST,
+    DEFAULT_PROXY_PORT,
+    DEFAULT_PROXY_MAX_AGE,
+    DEFAULT_TRANSPORT,
+    DEFAULT_UNIT_ID,
+    DISCOVERY_CONCURRENCY,
+    DISCOVERY_MAX_HOSTS,
+    DISCOVERY_TIMEOUT,
+    SAMPLE_INTERVAL,
+    TRANSPORT_NATIVE,
+    TRANSPORT_PYSUNSPEC2,
+)
+from .discovery import async_discover, async_probe_host
+
+_LOGGER = logging.getLogger(__name__)
 
-STEP_USER_DATA_SCHEMA = vol.Schema(
+CONF_DEVICE = "device"
+
+STEP_MANUAL_DATA_SCHEMA = vol.Schema(
     {
         vol.Required(CONF_HOST): str,
-        vol.Required(CONF_PORT, default=502): int,
-        vol.Required(CONF_POLL_INTERVAL, default=5): int,
+        vol.Required(CONF_PORT, default=DEFAULT_PORT): int,
+        vol.Required(CONF_POLL_INTERVAL, default=DEFAULT_POLL_INTERVAL): vol.All(int, vol.Range(min=1)),
+        vol.Optional(CONF_TRANSPORT, default=DEFAULT_TRANSPORT): vol.In(
+            [TRANSPORT_NATIVE, TRANSPORT_PYSUNSPEC2]
+        ),
+        vol.Optional(CONF_UNIT_IDS, default=str(DEFAULT_UNIT_ID)): str,
     }
 )
 
+# Valid Modbus unit IDs of devices behind a gateway
+MIN_UNIT_ID = 1
+MAX_UNIT_ID = 247
+
+def parse_unit_ids(value: str) -> list[int]:
+    """Parse a comma separated list of Modbus unit IDs and ranges like 1-4."""
+    unit_ids = set()
+    try:
+        for part in value.split(","):
+            if not part.strip():
+                continue
+            first, _, last = part.partition("-")
+            unit_ids.update(range(int(first), int(last or first) + 1))
+    except ValueError as err:
+        raise InvalidUnitIds from err
+    unit_ids = sorted(unit_ids)
+    if not unit_ids or not all(MIN_UNIT_ID <= unit_id <= MAX_UNIT_ID for unit_id in unit_ids):
+        raise InvalidUnitIds
+    return unit_ids
+
 async def validate_input(hass: HomeAssistant, data: dict[str, any]) -> dict[str, any]:
-    """Validate the user input allows us to connect."""
-    reader = SunSpecReader(hass, data[CONF_HOST], data[CONF_PORT], data[CONF_POLL_INTERVAL])
-    
-    # if not await hass.async_add_executor_job(reader.test_connection):
-    #     raise CannotConnect
+    """Validate that every configured unit answers as a SunSpec device."""
+    devices = await async_probe_host(data[CONF_HOST], data[CONF_PORT], data[CONF_UNIT_IDS], DISCOVERY_TIMEOUT)
+    if not devices:
+        raise CannotConnect
+    if len(devices) != len(data[CONF_UNIT_IDS]):
+        raise UnitsNotFound
+
+    return {"title": f"Pixii Home ({data[CONF_HOST]})", "serial_number": devices[0].serial_number}
 
-    return {"title": f"Pixii Home ({data[CONF_HOST]})"}
+def _device_label(devices) -> str:
+    """Describe the devices found on one host."""
+    first = devices[0]
+    name = " ".join(part for part in (first.manufacturer, first.model) if part) or "SunSpec device"
+    serial = f", SN {first.serial_number}" if first.serial_number else ""
+    units = ", ".join(str(device.unit_id) for device in devices)
+    return f"{name}{serial} at {first.host}:{first.port} (unit {units})"
 
 class ConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
     """Handle a config flow for Pixii Home."""
 
-    VERSION = 1
+    VERSION = 2
+
+    def __init__(self) -> None:
+        """Initialize the config flow."""
+        self._discovered = {}
 
     async def async_step_user(self, user_input=None) -> FlowResult:
-        """Handle the initial step."""
+        """Let the user search the network or enter the gateway address."""
+        return self.async_show_menu(step_id="user", menu_options=["discovery", "manual"])
+
+    async def async_step_discovery(self, user_input=None) -> FlowResult:
+        """Probe a network for SunSpec devices."""
+        errors = {}
+        if user_input is not None:
+            try:
+                unit_ids = parse_unit_ids(user_input[CONF_UNIT_IDS])
+                devices = await async_discover(
+                    user_input[CONF_NETWORK],
+                    user_input[CONF_PORT],
+                    unit_ids,
+                    DISCOVERY_TIMEOUT,
+                    DISCOVERY_CONCURRENCY,
+                    DISCOVERY_MAX_HOSTS,
+                )
+            except InvalidUnitIds:
+                errors[CONF_UNIT_IDS] = "invalid_unit_ids"
+            except ValueError:
+                errors[CONF_NETWORK] = "invalid_network"
+            except Exception:  # pylint: disable=broad-except
+                _LOGGER.exception("Unexpected error during discovery")
+                errors["base"] = "unknown"
+            else:
+                self._discovered = {}
+                for device in devices:
+                    self._discovered.setdefault(f"{device.host}:{device.port}", []).append(device)
+                if self._discovered:
+                    return await self.async_step_pick()
+                errors["base"] = "no_devices_found"
+
+        try:
+            network = str(ipaddress.ip_network(f"{await async_get_source_ip(self.hass)}/24", strict=False))
+        except ValueError:
+            network = ""
+        return self.async_show_form(
+            step_id="discovery",
+            data_schema=vol.Schema(
+                {
+                    vol.Required(CONF_NETWORK, default=network): str,
+                    vol.Required(CONF_PORT, default=DEFAULT_PORT): int,
+                    vol.Required(CONF_UNIT_IDS, default=str(DEFAULT_UNIT_ID)): str,
+                }
+            ),
+            errors=errors,
+        )
+
+    async def async_step_pick(self, user_input=None) -> FlowResult:
+        """Create an entry for the units of the gateway picked from the discovered ones."""
+        if user_input is not None:
+            devices = self._discovered[user_input[CONF_DEVICE]]
+            first = devices[0]
+            if first.serial_number:
+                await self.async_set_unique_id(first.serial_number)
+                self._abort_if_unique_id_configured()
+            return self.async_create_entry(
+                title=f"Pixii Home ({first.host})",
+                data={
+                    CONF_HOST: first.host,
+                    CONF_PORT: first.port,
+                    CONF_POLL_INTERVAL: DEFAULT_POLL_INTERVAL,
+                    CONF_TRANSPORT: DEFAULT_TRANSPORT,
+                    CONF_UNIT_IDS: [device.unit_id for device in devices],
+                },
+            )
+
+        return self.async_show_form(
+            step_id="pick",
+            data_schema=vol.Schema(
+                {
+                    vol.Required(CONF_DEVICE): vol.In(
+                        {key: _device_label(devices) for key, devices in self._discovered.items()}
+                    ),
+                }
+            ),
+        )
+
+    async def async_step_manual(self, user_input=None) -> FlowResult:
+        """Handle a gateway address entered by the user."""
         errors = {}
         if user_input is not None:
             try:
+                user_input[CONF_UNIT_IDS] = parse_unit_ids(user_input[CONF_UNIT_IDS])
                 info = await validate_input(self.hass, user_input)
-                return self.async_create_entry(title=info["title"], data=user_input)
+            except InvalidUnitIds:
+                errors[CONF_UNIT_IDS] = "invalid_unit_ids"
             except CannotConnect:
                 errors["base"] = "cannot_connect"
+            except UnitsNotFound:
+                errors[CONF_UNIT_IDS] = "units_not_found"
             except Exception:  # pylint: disable=broad-except
+                _LOGGER.exception("Unexpected error validating the connection")
                 errors["base"] = "unknown"
+            else:
+                if info["serial_number"]:
+                    await self.async_set_unique_id(info["serial_number"])
+                    self._abort_if_unique_id_configured()
+                return self.async_create_entry(title=info["title"], data=user_input)
+
+        return self.async_show_form(
+            step_id="manual", data_schema=STEP_MANUAL_DATA_SCHEMA, errors=errors
+        )
+
+    @staticmethod
+    @callback
+    def async_get_options_flow(config_entry: config_entries.ConfigEntry) -> OptionsFlowHandler:
+        """Get the options flow for this handler."""
+        return OptionsFlowHandler(config_entry)
+
+class OptionsFlowHandler(config_entries.OptionsFlow):
+    """Handle Pixii Home options."""
 
+    def __init__(self, config_entry: config_entries.ConfigEntry) -> None:
+        """Initialize options flow."""
+        self.config_entry = config_entry
+
+    async def async_step_init(self, user_input=None) -> FlowResult:
+        """Manage polling intervals, state write deadbands, expanded points, sampling, adaptive polling, the proxy and capture mode."""
+        errors = {}
+        if user_input is not None:
+            transport = self.config_entry.data.get(CONF_TRANSPORT, DEFAULT_TRANSPORT)
+            if user_input[CONF_PROXY] and transport != TRANSPORT_NATIVE:
+                # The proxy forwards over the native client, which the pysunspec2 transport does not have
+                errors[CONF_PROXY] = "proxy_requires_native_transport"
+            else:
+                return self.async_create_entry(title="", data=user_input)
+
+        options = {**self.config_entry.data, **self.config_entry.options, **(user_input or {})}
         return self.async_show_form(
-            step_id="user", data_schema=STEP_USER_DATA_SCHEMA, errors=errors
+            step_id="init",
+            data_schema=vol.Schema(
+                {
+                    vol.Required(
+                        CONF_POLL_INTERVAL,
+                        default=options.get(CONF_POLL_INTERVAL, DEFAULT_POLL_INTERVAL),
+                    ): vol.All(int, vol.Range(min=1)),
+                    vol.Required(
+                        CONF_MEDIUM_POLL_INTERVAL,
+                        default=options.get(CONF_MEDIUM_POLL_INTERVAL, DEFAULT_MEDIUM_POLL_INTERVAL),
+                    ): vol.All(int, vol.Range(min=1)),
+                    vol.Required(
+                        CONF_SLOW_POLL_INTERVAL,
+                        default=options.get(CONF_SLOW_POLL_INTERVAL, DEFAULT_SLOW_POLL_INTERVAL),
+                    ): vol.All(int, vol.Range(min=1)),
+                    vol.Required(
+                        CONF_POWER_DEADBAND,
+                        default=options.get(CONF_POWER_DEADBAND, DEFAULT_POWER_DEADBAND),
+                    ): vol.All(vol.Coerce(float), vol.Range(min=0)),
+                    vol.Required(
+                        CONF_SOC_DEADBAND,
+                        default=options.get(CONF_SOC_DEADBAND, DEFAULT_SOC_DEADBAND),
+                    ): vol.All(vol.Coerce(float), vol.Range(min=0)),
+                    vol.Required(
+                        CONF_TEMPERATURE_DEADBAND,
+                        default=options.get(CONF_TEMPERATURE_DEADBAND, DEFAULT_TEMPERATURE_DEADBAND),
+                    ): vol.All(vol.Coerce(float), vol.Range(min=0)),
+                    vol.Required(
+                        CONF_RELATIVE_DEADBAND,
+                        default=options.get(CONF_RELATIVE_DEADBAND, DEFAULT_RELATIVE_DEADBAND),
+                    ): vol.All(vol.Coerce(float), vol.Range(min=0, max=100)),
+                    vol.Required(
+                        CONF_MAX_SILENCE,
+                        default=options.get(CONF_MAX_SILENCE, DEFAULT_MAX_SILENCE),
+                    ): vol.All(int, vol.Range(min=1)),
+                    vol.Required(
+                        CONF_EXPANDED_POINTS,
+                        default=options.get(CONF_EXPANDED_POINTS, False),
+                    ): bool,
+                    vol.Required(
+                        CONF_SAMPLING,
+                        default=options.get(CONF_SAMPLING, False),
+                    ): bool,
+                    vol.Required(
+                        CONF_AGGREGATE_INTERVAL,
+                        default=options.get(CONF_AGGREGATE_INTERVAL, DEFAULT_AGGREGATE_INTERVAL),
+                    ): vol.All(int, vol.Range(min=SAMPLE_INTERVAL)),
+                    vol.Required(
+                        CONF_ADAPTIVE_POLLING,
+                        default=options.get(CONF_ADAPTIVE_POLLING, False),
+                    ): bool,
+                    vol.Required(
+                        CONF_MIN_POLL_INTERVAL,
+                        default=options.get(CONF_MIN_POLL_INTERVAL, DEFAULT_MIN_POLL_INTERVAL),
+                    ): vol.All(int, vol.Range(min=1)),
+                    vol.Required(
+                        CONF_MAX_POLL_INTERVAL,
+                        default=options.get(CONF_MAX_POLL_INTERVAL, DEFAULT_MAX_POLL_INTERVAL),
+                    ): vol.All(int, vol.Range(min=1)),
+                    vol.Required(
+                        CONF_PROXY,
+                        default=options.get(CONF_PROXY, False),
+                    ): bool,
+                    vol.Required(
+                        CONF_PROXY_HOST,
+                        default=options.get(CONF_PROXY_HOST, DEFAULT_PROXY_HOST),
+                    ): str,
+                    vol.Required(
+                        CONF_PROXY_PORT,
+                        default=options.get(CONF_PROXY_PORT, DEFAULT_PROXY_PORT),
+                    ): vol.All(int, vol.Range(min=1, max=65535)),
+                    vol.Required(
+                        CONF_PROXY_MAX_AGE,
+                        default=options.get(CONF_PROXY_MAX_AGE, DEFAULT_PROXY_MAX_AGE),
+                    ): vol.All(vol.Coerce(float), vol.Range(min=0)),
+                    vol.Required(
+                        CONF_PROXY_WRITES,
+                        default=options.get(CONF_PROXY_WRITES, False),
+                    ): bool,
+                    vol.Required(
+                        CONF_CAPTURE,
+                        default=options.get(CONF_CAPTURE, False),
+                    ): bool,
+                }
+            ),
+            errors=errors,
         )
 
 class CannotConnect(HomeAssistantError):
-    """Error to indicate we cannot connect."""
\ No newline at end of file
+    """Error to indicate we cannot connect."""
+
+class InvalidUnitIds(HomeAssistantError):
+    """Error to indicate the unit IDs are not a list of Modbus unit IDs."""
+
+class UnitsNotFound(HomeAssistantError):
+    """Error to indicate some of the unit IDs did not answer."""
\ No newline at end of file
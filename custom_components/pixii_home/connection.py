@@ -0,0 +1,108 @@
+"""Reconnect backoff and circuit breaker for the Pixii Home gateway connection."""
+from __future__ import annotations
+
+import random
+from typing import Optional
+
+from .modbus_tcp import ModbusTcpClient
+
+STATE_CLOSED = "closed"
+STATE_OPEN = "open"
+STATE_HALF_OPEN = "half_open"
+
+class Backoff:
+    """Jittered exponential backoff between reconnect attempts."""
+
+    def __init__(self, minimum: float, maximum: float):
+        """Initialize."""
+        self.minimum = minimum
+        self.maximum = maximum
+        self.attempts = 0
+
+    def next_delay(self) -> float:
+        """Return the delay before the next attempt and count the attempt."""
+        delay = min(self.minimum * 2 ** self.attempts, self.maximum)
+        self.attempts += 1
+        # Full jitter over the upper half keeps a fleet of integrations from reconnecting in lockstep
+        return random.uniform(delay / 2, delay)
+
+    def reset(self) -> None:
+        """Start over after a successful attempt."""
+        self.attempts = 0
+
+class CircuitBreaker:
+    """Pause polling after repeated failures.
+
+    After failure_threshold consecutive failures the breaker opens and no
+    polls are attempted until the backoff delay has passed. The breaker then
+    goes half open: the next poll starts with a cheap probe and closes the
+    breaker again on success, or reopens it with a longer delay on failure.
+    """
+
+    def __init__(self, failure_threshold: int, backoff: Backoff):
+        """Initialize."""
+        self.failure_threshold = failure_threshold
+        self.backoff = backoff
+        self.state = STATE_CLOSED
+        self.consecutive_failures = 0
+        self.last_error: Optional[str] = None
+        self.retry_at: Optional[float] = None
+
+    def allow_request(self, now: float) -> bool:
+        """Return True if a poll may be attempted now."""
+        if self.state == STATE_OPEN:
+            if now < self.retry_at:
+                return False
+            self.state = STATE_HALF_OPEN
+        return True
+
+    def record_success(self) -> None:
+        """Close the breaker after a successful poll."""
+        self.state = STATE_CLOSED
+        self.consecutive_failures = 0
+        self.last_error = None
+        self.retry_at = None
+        self.backoff.reset()
+
+    def record_failure(self, now: float, err: Exception) -> bool:
+        """Count a failed poll and return True if the breaker opened because of it."""
+        self.consecutive_failures += 1
+        self.last_error = str(err)
+        if self.state == STATE_HALF_OPEN or self.consecutive_failures >= self.failure_threshold:
+            opened = self.state != STATE_OPEN
+            self.state = STATE_OPEN
+            self.retry_at = now + self.backoff.next_delay()
+            return opened
+        return False
+
+class ConnectionPool:
+    """Modbus TCP clients shared by all units polled on the same gateway.
+
+    Every unit acquires the client of its host and port, and the connection
+    is closed when the last unit releases it. The client's in-flight limit
+    serializes the requests of all units on the connection.
+    """
+
+    def __init__(self):
+        """Initialize."""
+        self._clients: dict[tuple[str, int], list] = {}
+
+    def acquire(
+        self, host: str, port: int, timeout: float, max_in_flight: int, backoff: Optional[Backoff] = None
+    ) -> ModbusTcpClient:
+        """Return the client of a gateway, creating it with the given reconnect backoff for its first user."""
+        entry = self._clients.get((host, port))
+        if entry is None:
+            entry = self._clients[(host, port)] = [ModbusTcpClient(host, port, timeout, max_in_flight, backoff), 0]
+        entry[1] += 1
+        return entry[0]
+
+    async def async_release(self, client: ModbusTcpClient) -> None:
+        """Release a client, closing it when it has no users left."""
+        entry = self._clients.get((client.host, client.port))
+        if entry is None or entry[0] is not client:
+            return
+        entry[1] -= 1
+        if entry[1] <= 0:
+            del self._clients[(client.host, client.port)]
+            await client.async_close()
@@ -1,4 +1,111 @@
 """Constants for the Pixii home integration."""
 
 DOMAIN = "pixii_home"
-CONF_POLL_INTERVAL = "poll_interval"
\ No newline at end of file
+CONF_POLL_INTERVAL = "poll_interval"
+CONF_MEDIUM_POLL_INTERVAL = "medium_poll_interval"
+CONF_SLOW_POLL_INTERVAL = "slow_poll_interval"
+CONF_TRANSPORT = "transport"
+CONF_UNIT_IDS = "unit_ids"
+CONF_NETWORK = "network"
+CONF_POWER_DEADBAND = "power_deadband"
+CONF_SOC_DEADBAND = "soc_deadband"
+CONF_TEMPERATURE_DEADBAND = "temperature_deadband"
+CONF_RELATIVE_DEADBAND = "relative_deadband"
+CONF_MAX_SILENCE = "max_silence"
+CONF_EXPANDED_POINTS = "expanded_points"
+CONF_SAMPLING = "sampling"
+CONF_AGGREGATE_INTERVAL = "aggregate_interval"
+CONF_ADAPTIVE_POLLING = "adaptive_polling"
+CONF_MIN_POLL_INTERVAL = "min_poll_interval"
+CONF_MAX_POLL_INTERVAL = "max_poll_interval"
+CONF_PROXY = "proxy"
+CONF_PROXY_PORT = "proxy_port"
+CONF_PROXY_MAX_AGE = "proxy_max_age"
+CONF_PROXY_HOST = "proxy_host"
+CONF_PROXY_WRITES = "proxy_writes"
+CONF_CAPTURE = "capture"
+
+DEFAULT_PORT = 502
+DEFAULT_POLL_INTERVAL = 5
+DEFAULT_MEDIUM_POLL_INTERVAL = 30
+DEFAULT_SLOW_POLL_INTERVAL = 3600
+DEFAULT_POWER_DEADBAND = 5.0
+DEFAULT_SOC_DEADBAND = 0.1
+DEFAULT_TEMPERATURE_DEADBAND = 0.5
+DEFAULT_RELATIVE_DEADBAND = 0.0
+DEFAULT_MAX_SILENCE = 300
+DEFAULT_AGGREGATE_INTERVAL = 60
+DEFAULT_ENERGY_DEADBAND = 0.01
+DEFAULT_MIN_POLL_INTERVAL = 1
+DEFAULT_MAX_POLL_INTERVAL = 60
+DEFAULT_PROXY_PORT = 1502
+DEFAULT_PROXY_MAX_AGE = 10
+
+# Sampling mode: poll live values every second and keep the last hour of samples
+SAMPLE_INTERVAL = 1
+SAMPLE_BUFFER_SIZE = 3600
+
+DEFAULT_UNIT_ID = 1
+
+# Modbus TCP clients shared per gateway by all config entries
+DATA_CONNECTIONS = f"{DOMAIN}_connections"
+GATEWAY_MAX_IN_FLIGHT = 1
+
+# Caching Modbus TCP proxy for other local consumers of the gateway, listening on all interfaces
+DATA_PROXIES = f"{DOMAIN}_proxies"
+DEFAULT_PROXY_HOST = "0.0.0.0"
+
+TRANSPORT_NATIVE = "native"
+TRANSPORT_PYSUNSPEC2 = "pysunspec2"
+DEFAULT_TRANSPORT = TRANSPORT_NATIVE
+
+# Polling tiers: live values, slowly changing values and static nameplate data
+TIER_FAST = "fast"
+TIER_MEDIUM = "medium"
+TIER_SLOW = "slow"
+TIERS = (TIER_FAST, TIER_MEDIUM, TIER_SLOW)
+
+# SunSpec model IDs used by the entities
+MODEL_COMMON = 1
+MODEL_INVERTER = 103
+MODEL_BATTERY = 802
+
+# Models read on every poll once the device layout is known
+POLLED_MODELS = (MODEL_COMMON, MODEL_INVERTER, MODEL_BATTERY)
+
+# SunSpec register map
+SUNSPEC_MARKER = b"SunS"
+SUNSPEC_END_MODEL_ID = 0xFFFF
+SUNSPEC_BASE_ADDRESSES = (40000, 0, 50000)
+
+# Connection management
+MODBUS_TIMEOUT = 3.0
+RECONNECT_MIN_DELAY = 1.0
+RECONNECT_MAX_DELAY = 60.0
+CIRCUIT_BREAKER_FAILURES = 3
+CIRCUIT_BREAKER_MIN_DELAY = 10.0
+CIRCUIT_BREAKER_MAX_DELAY = 300.0
+
+# Network discovery: probe timeout in seconds, hosts probed at once and largest network scanned
+DISCOVERY_TIMEOUT = 1.0
+DISCOVERY_CONCURRENCY = 64
+DISCOVERY_MAX_HOSTS = 1024
+
+# Persistent model layout cache
+LAYOUT_STORAGE_KEY = f"{DOMAIN}.layout"
+LAYOUT_STORAGE_VERSION = 1
+
+# Persistent energy totals, saved at most once per delay
+ENERGY_STORAGE_KEY = f"{DOMAIN}.energy"
+ENERGY_STORAGE_VERSION = 1
+ENERGY_SAVE_DELAY = 60
+
+# Capture of the raw register blocks of each poll, in a directory of the configuration
+CAPTURE_DIR = f"{DOMAIN}_capture"
+CAPTURE_MAX_BYTES = 16 * 1024 * 1024
+CAPTURE_BACKUPS = 3
+CAPTURE_FLUSH_BYTES = 64 * 1024
+CAPTURE_FLUSH_INTERVAL = 30
+
+# Power samples further apart than this are not integrated
+MIN_INTEGRATION_GAP = 60
@@ -0,0 +1,38 @@
+"""Declarative table of the battery control points exposed as Pixii Home entities."""
+from __future__ import annotations
+
+from typing import NamedTuple, Optional
+
+from homeassistant.const import PERCENTAGE, POWER_WATT
+
+from .commands import PRIORITY_HIGH
+
+class ControlPoint(NamedTuple):
+    """A writable point of the battery model (802), exposed as a number entity.
+
+    Without a maximum, the largest value the register can hold with the
+    current scale factor is used.
+    """
+
+    key: str
+    name: str
+    point: str
+    unit: str
+    minimum: float
+    maximum: Optional[float]
+    step: float
+
+CONTROL_NUMBERS = [
+    ControlPoint("soc_reserve_max", "Maximum Reserve State of Charge", "SocRsvMax", PERCENTAGE, 0, 100, 1),
+    ControlPoint("soc_reserve_min", "Minimum Reserve State of Charge", "SoCRsvMin", PERCENTAGE, 0, 100, 1),
+    ControlPoint("max_charge_rate", "Maximum Charge Rate", "WChaRteMax", POWER_WATT, 0, None, 100),
+    ControlPoint("max_discharge_rate", "Maximum Discharge Rate", "WDisChaRteMax", POWER_WATT, 0, None, 100),
+]
+
+# Local or remote control of the battery, exposed as a select entity
+CONTROL_MODE_KEY = "control_mode"
+CONTROL_MODE_POINT = "LocRemCtl"
+CONTROL_MODES = {0: "Remote", 1: "Local"}
+
+# The control mode is written before the setpoints that only apply in remote mode
+CONTROL_PRIORITIES = {CONTROL_MODE_POINT: PRIORITY_HIGH}
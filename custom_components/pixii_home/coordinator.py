@@ -2,19 +2,77 @@
 from datetime import timedelta
 import logging
 import json
+import time
+from typing import Any, Mapping
 
-from homeassistant.core import HomeAssistant
-from homeassistant.helpers.update_coordinator import DataUpdateCoordinator
+from homeassistant.components.sensor import SensorDeviceClass
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.exceptions import HomeAssistantError
+from homeassistant.helpers.entity import DeviceInfo
+from homeassistant.helpers.storage import Store
+from homeassistant.helpers.update_coordinator import DataUpdateCoordinator, UpdateFailed
 
-from .const import DOMAIN
+from .const import (
+    CONF_ADAPTIVE_POLLING,
+    CONF_AGGREGATE_INTERVAL,
+    CONF_MAX_POLL_INTERVAL,
+    CONF_MAX_SILENCE,
+    CONF_MEDIUM_POLL_INTERVAL,
+    CONF_MIN_POLL_INTERVAL,
+    CONF_POLL_INTERVAL,
+    CONF_POWER_DEADBAND,
+    CONF_RELATIVE_DEADBAND,
+    CONF_SAMPLING,
+    CONF_SLOW_POLL_INTERVAL,
+    CONF_SOC_DEADBAND,
+    CONF_TEMPERATURE_DEADBAND,
+    CONF_UNIT_IDS,
+    DEFAULT_AGGREGATE_INTERVAL,
+    DEFAULT_ENERGY_DEADBAND,
+    DEFAULT_MAX_POLL_INTERVAL,
+    DEFAULT_MAX_SILENCE,
+    DEFAULT_MEDIUM_POLL_INTERVAL,
+    DEFAULT_MIN_POLL_INTERVAL,
+    DEFAULT_POLL_INTERVAL,
+    DEFAULT_POWER_DEADBAND,
+    DEFAULT_RELATIVE_DEADBAND,
+    DEFAULT_SLOW_POLL_INTERVAL,
+    DEFAULT_SOC_DEADBAND,
+    DEFAULT_TEMPERATURE_DEADBAND,
+    DEFAULT_UNIT_ID,
+    DOMAIN,
+    ENERGY_SAVE_DELAY,
+    ENERGY_STORAGE_KEY,
+    ENERGY_STORAGE_VERSION,
+    MIN_INTEGRATION_GAP,
+    MODEL_BATTERY,
+    MODEL_INVERTER,
+    SAMPLE_BUFFER_SIZE,
+    SAMPLE_INTERVAL,
+    TIER_FAST,
+    TIER_MEDIUM,
+    TIER_SLOW,
+    TIERS,
+)
+from .controls import CONTROL_PRIORITIES
+from .deadband import Deadband
+from .energy import EnergyAccumulator
+from .points import compile_extractor, enabled_points
+from .scheduler import AdaptiveInterval
+from .sampling import SAMPLED_POINTS, SampleBuffer
+from .snapshot import PixiiHomeSnapshot
 
 _LOGGER = logging.getLogger(__name__)
 
 class PixiiHomeDataCoordinator(DataUpdateCoordinator):
     """Class to manage fetching Pixii Home data."""
 
-    def __init__(self, hass: HomeAssistant, reader, poll_interval: int):
+    def __init__(self, hass: HomeAssistant, reader, options: dict):
         """Initialize."""
+        poll_interval = options.get(CONF_POLL_INTERVAL, DEFAULT_POLL_INTERVAL)
+        sampling = options.get(CONF_SAMPLING, False)
+        if sampling:
+            poll_interval = SAMPLE_INTERVAL
         super().__init__(
             hass,
             _LOGGER,
@@ -23,9 +81,209 @@ class PixiiHomeDataCoordinator(DataUpdateCoordinator):
         )
         self.reader = reader
         self.data = None
+        # Time source of the polling tiers, adaptive polling and energy integration, replays use the capture time
+        self.clock = time.monotonic
+        # Time source of the sample timestamps, which diagnostics show as epoch times
+        self.wall_clock = time.time
+        # Entities and the device of each unit are keyed by config entry and unit ID
+        entry_id = self.config_entry.entry_id if self.config_entry else None
+        self.unit_key = f"{entry_id}_{reader.unit_id}"
+        unit_ids = self.config_entry.data.get(CONF_UNIT_IDS, [DEFAULT_UNIT_ID]) if self.config_entry else ()
+        self.device_name = f"Pixii Home Unit {reader.unit_id}" if len(unit_ids) > 1 else "Pixii Home"
+        self.tier_intervals = {
+            TIER_FAST: poll_interval,
+            TIER_MEDIUM: options.get(CONF_MEDIUM_POLL_INTERVAL, DEFAULT_MEDIUM_POLL_INTERVAL),
+            TIER_SLOW: options.get(CONF_SLOW_POLL_INTERVAL, DEFAULT_SLOW_POLL_INTERVAL),
+        }
+        self.deadbands = {
+            SensorDeviceClass.POWER: options.get(CONF_POWER_DEADBAND, DEFAULT_POWER_DEADBAND),
+            SensorDeviceClass.BATTERY: options.get(CONF_SOC_DEADBAND, DEFAULT_SOC_DEADBAND),
+            SensorDeviceClass.TEMPERATURE: options.get(CONF_TEMPERATURE_DEADBAND, DEFAULT_TEMPERATURE_DEADBAND),
+            SensorDeviceClass.ENERGY: DEFAULT_ENERGY_DEADBAND,
+        }
+        self.relative_deadband = options.get(CONF_RELATIVE_DEADBAND, DEFAULT_RELATIVE_DEADBAND) / 100
+        self.max_silence = options.get(CONF_MAX_SILENCE, DEFAULT_MAX_SILENCE)
+        self.aggregate_interval = options.get(CONF_AGGREGATE_INTERVAL, DEFAULT_AGGREGATE_INTERVAL)
+        self.adaptive = None
+        max_poll_interval = poll_interval
+        if options.get(CONF_ADAPTIVE_POLLING, False) and not sampling:
+            max_poll_interval = options.get(CONF_MAX_POLL_INTERVAL, DEFAULT_MAX_POLL_INTERVAL)
+            self.adaptive = AdaptiveInterval(
+                poll_interval,
+                options.get(CONF_MIN_POLL_INTERVAL, DEFAULT_MIN_POLL_INTERVAL),
+                max_poll_interval,
+            )
+            self.update_interval = timedelta(seconds=self.adaptive.interval)
+        reader.metrics.set_poll_interval(self.update_interval.total_seconds())
+        # Registers of the slower tiers stay fresh for cached reads until their next poll is overdue
+        reader.set_tier_lifetimes({
+            tier: interval + max_poll_interval
+            for tier, interval in self.tier_intervals.items()
+            if tier != TIER_FAST
+        })
+        self.samples = SampleBuffer(SAMPLED_POINTS, SAMPLE_BUFFER_SIZE) if sampling else None
+        self.aggregates = {}
+        self._published_count = 0
+        self._last_publish = None
+        self._last_publish_success = True
+        # Allow a few missed polls before an interval counts as a gap in the power samples
+        self.energy = EnergyAccumulator(max(3 * max_poll_interval, MIN_INTEGRATION_GAP))
+        self._energy_store = None
+        self.points = enabled_points(options)
+        self._extract = compile_extractor(self.points)
+        self.values = {}
+        self.attributes = {}
+        self._tier_last_read = {}
+        self._device_info = None
+        self._device_info_key = None
+
+    def deadband_for(self, device_class) -> Deadband:
+        """Create the change detection of an entity with the given device class."""
+        return Deadband(
+            self.deadbands.get(device_class, 0.0),
+            self.relative_deadband,
+            self.max_silence,
+        )
+
+    def _due_tiers(self, now: float) -> list:
+        """Return the polling tiers whose interval has elapsed."""
+        # Half a fast cycle of tolerance keeps scheduling jitter from skipping a whole cycle
+        tolerance = self.update_interval.total_seconds() / 2
+        due = [TIER_FAST]
+        for tier in (TIER_MEDIUM, TIER_SLOW):
+            last_read = self._tier_last_read.get(tier)
+            if last_read is None or now - last_read + tolerance >= self.tier_intervals[tier]:
+                due.append(tier)
+        return due
 
     async def _async_update_data(self):
         """Fetch data from Pixii Home reader."""
-        self.data = await self.reader.async_read_data()
-        _LOGGER.debug("All Data:\n%s", json.dumps(self.data, indent=2))
-        return self.data
\ No newline at end of file
+        now = self.clock()
+        timeouts = self.reader.metrics.timeouts
+        try:
+            data = await self.reader.async_read_data(self._due_tiers(now))
+        except HomeAssistantError as err:
+            if self.adaptive is not None and self.reader.metrics.timeouts > timeouts:
+                self._set_interval(self.adaptive.back_off())
+            raise UpdateFailed(str(err)) from err
+        for tier in self.reader.tiers_read:
+            self._tier_last_read[tier] = now
+        if _LOGGER.isEnabledFor(logging.DEBUG):
+            _LOGGER.debug("All Data:\n%s", json.dumps(data, indent=2))
+        start = time.perf_counter()
+        self.data = PixiiHomeSnapshot.from_reader_data(data)
+        self.values, self.attributes = self._extract(
+            self.data, self.reader.tiers_read, (self.values, self.attributes) if self.values else None
+        )
+        self._accumulate_energy(self.data)
+        if self.adaptive is not None:
+            self._adapt_interval(self.data, now)
+        if self.samples is not None:
+            self._append_sample(self.data)
+        self.reader.metrics.loop_time += time.perf_counter() - start
+        return self.data
+
+    def _adapt_interval(self, snapshot: PixiiHomeSnapshot, now: float) -> None:
+        """Adjust the poll interval to how fast battery and inverter power change."""
+        battery = snapshot.model(MODEL_BATTERY) or {}
+        inverter = snapshot.model(MODEL_INVERTER) or {}
+        self._set_interval(
+            self.adaptive.update((battery.get("W"), inverter.get("W")), inverter.get("St"), now)
+        )
+
+    def _set_interval(self, seconds: float) -> None:
+        """Schedule the following refreshes at the given interval."""
+        if seconds != self.update_interval.total_seconds():
+            _LOGGER.debug("Poll interval changed to %s s", seconds)
+            self.update_interval = timedelta(seconds=seconds)
+            self.reader.metrics.set_poll_interval(seconds)
+
+    def _accumulate_energy(self, snapshot: PixiiHomeSnapshot) -> None:
+        """Add the energy since the previous refresh to the totals and schedule saving them."""
+        battery = snapshot.model(MODEL_BATTERY)
+        if battery:
+            self.energy.add_battery_power(battery.get("W"), self.clock())
+        inverter = snapshot.model(MODEL_INVERTER)
+        if inverter:
+            self.energy.add_inverter_counter(inverter.get("WH"), inverter.get("WH_SF"))
+        if self._energy_store is not None:
+            self._energy_store.async_delay_save(self.energy.as_dict, ENERGY_SAVE_DELAY)
+
+    async def async_write_controls(self, values: Mapping[str, Any]) -> None:
+        """Write control points of the battery model and publish the values read back."""
+        model = await self.reader.async_write_points(MODEL_BATTERY, values, CONTROL_PRIORITIES)
+        if self.data is None:
+            return
+        self.data = PixiiHomeSnapshot({**self.data.models, MODEL_BATTERY: model})
+        self.values, self.attributes = self._extract(self.data, TIERS, (self.values, self.attributes))
+        # Control changes are published right away, also in sampling mode
+        super().async_update_listeners()
+
+    async def async_load_energy(self) -> None:
+        """Restore the energy totals of the config entry."""
+        if self.config_entry is None:
+            return
+        suffix = f".{self.reader.unit_id}" if self.reader.unit_id != DEFAULT_UNIT_ID else ""
+        self._energy_store = Store(
+            self.hass, ENERGY_STORAGE_VERSION, f"{ENERGY_STORAGE_KEY}.{self.config_entry.entry_id}{suffix}"
+        )
+        data = await self._energy_store.async_load()
+        if data:
+            self.energy.restore(data)
+
+    async def async_save_energy(self) -> None:
+        """Save the energy totals now, instead of after the save delay."""
+        if self._energy_store is not None:
+            await self._energy_store.async_save(self.energy.as_dict())
+
+    def _append_sample(self, snapshot: PixiiHomeSnapshot) -> None:
+        """Store the sampled points of a refresh in the sample buffer."""
+        values = {}
+        for key, (model_id, point) in SAMPLED_POINTS.items():
+            model = snapshot.model(model_id)
+            values[key] = model.get(point) if model else None
+        self.samples.append(self.wall_clock(), values)
+
+    @callback
+    def async_update_listeners(self) -> None:
+        """Update the entities, in sampling mode only once per aggregate interval."""
+        if self.samples is not None:
+            now = self.clock()
+            if (
+                self.last_update_success == self._last_publish_success
+                and self._last_publish is not None
+                and now - self._last_publish + SAMPLE_INTERVAL / 2 < self.aggregate_interval
+            ):
+                return
+            self.aggregates = {
+                key: self.samples.aggregate(key, self._published_count) for key in SAMPLED_POINTS
+            }
+            self._published_count = self.samples.count
+            self._last_publish = now
+            self._last_publish_success = self.last_update_success
+        super().async_update_listeners()
+
+    @property
+    def device_info(self) -> DeviceInfo:
+        """Return device information, rebuilt only when the common model changes."""
+        info_data = self.data.info if self.data else None
+        key = tuple(info_data.get(point) for point in ("Mn", "Md", "Vr", "SN")) if info_data else None
+        if self._device_info is None or key != self._device_info_key:
+            self._device_info_key = key
+            if info_data:
+                self._device_info = DeviceInfo(
+                    identifiers={(DOMAIN, self.unit_key)},
+                    name=self.device_name,
+                    manufacturer=info_data.get("Mn", "Pixii"),
+                    model=info_data.get("Md", "Battery"),
+                    sw_version=info_data.get("Vr", "Unknown"),
+                    hw_version=info_data.get("SN", "Unknown"),
+                )
+            else:
+                self._device_info = DeviceInfo(
+                    identifiers={(DOMAIN, self.unit_key)},
+                    name=self.device_name,
+                    manufacturer="Pixii",
+                    model="Battery",
+                )
+        return self._device_info
@@ -0,0 +1,50 @@
+"""Change detection for Pixii Home entity state writes."""
+from __future__ import annotations
+
+from typing import Any, Optional
+
+class Deadband:
+    """Decide whether a new entity state differs enough from the last written one.
+
+    Numeric states are written when they move by at least the absolute
+    deadband or the relative deadband (a fraction of the last written value),
+    whichever is larger. Any other change, including attribute and
+    availability changes, is written immediately. A state that has not been
+    written for max_silence seconds is written again as a heartbeat.
+    """
+
+    __slots__ = ("absolute", "relative", "max_silence", "_value", "_extra", "_written_at")
+
+    def __init__(self, absolute: float = 0.0, relative: float = 0.0, max_silence: Optional[float] = None):
+        """Initialize."""
+        self.absolute = absolute
+        self.relative = relative
+        self.max_silence = max_silence
+        self._value: Any = None
+        self._extra: Any = None
+        self._written_at: Optional[float] = None
+
+    def should_write(self, value: Any, extra: Any, now: float) -> bool:
+        """Return True and remember the state if it has to be written."""
+        if self._written_at is not None and not self._changed(value, extra):
+            if self.max_silence is None or now - self._written_at < self.max_silence:
+                return False
+
+        self._value = value
+        self._extra = extra
+        self._written_at = now
+        return True
+
+    def _changed(self, value: Any, extra: Any) -> bool:
+        """Return True if the state moved outside the deadband."""
+        if extra != self._extra:
+            return True
+        last = self._value
+        if (
+            isinstance(value, (int, float))
+            and isinstance(last, (int, float))
+            and not isinstance(value, bool)
+            and not isinstance(last, bool)
+        ):
+            return abs(value - last) >= max(self.absolute, self.relative * abs(last)) and value != last
+        return value != last
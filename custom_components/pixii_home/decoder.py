@@ -0,0 +1,91 @@
+"""Fast decoding of SunSpec model registers with precomputed struct layouts."""
+from __future__ import annotations
+
+from functools import lru_cache
+import struct
+from typing import Any, Optional
+
+from .sunspec_models import MODEL_HEADER_LEN, MODEL_POINTS, NOT_IMPLEMENTED, SIGNED_TYPES
+
+# struct format characters of the fixed-size point types
+TYPE_FORMATS = {1: "H", 2: "I"}
+SIGNED_FORMATS = {1: "h", 2: "i"}
+
+def _sentinel(point_type: str) -> int:
+    """Return the not implemented value as it is unpacked from the registers."""
+    value = NOT_IMPLEMENTED[point_type]
+    if point_type in SIGNED_TYPES:
+        bits = 32 if point_type == "int32" else 16
+        if value >= 1 << (bits - 1):
+            value -= 1 << bits
+    return value
+
+class ModelDecoder:
+    """Decoder of the registers of one model, with its layout compiled into tables.
+
+    A single struct call unpacks all points of the model including its header.
+    Not implemented values are then replaced by None, strings are trimmed,
+    and scale factors are applied to all scaled points in one batch. The
+    result matches pysunspec2's get_dict(computed=True) for the model.
+    """
+
+    def __init__(self, model_id: int, model_len: int):
+        """Initialize."""
+        self.model_id = model_id
+        self.model_len = model_len
+        names = ["ID", "L"]
+        formats = [">HH"]
+        sentinels = []
+        strings = []
+        scaled = []
+        offset = MODEL_HEADER_LEN
+        points = [
+            point for point in MODEL_POINTS[model_id].values()
+            if point.offset + point.size <= model_len + MODEL_HEADER_LEN
+        ]
+        for point in points:
+            if point.offset > offset:
+                formats.append(f"{(point.offset - offset) * 2}x")
+            index = len(names)
+            names.append(point.name)
+            if point.type == "string":
+                formats.append(f"{point.size * 2}s")
+                strings.append(index)
+            else:
+                formats.append((SIGNED_FORMATS if point.type in SIGNED_TYPES else TYPE_FORMATS)[point.size])
+                sentinels.append((index, _sentinel(point.type)))
+            offset = point.offset + point.size
+        index_of = {name: index for index, name in enumerate(names)}
+        for point in points:
+            if point.sf is not None and point.sf in index_of:
+                scaled.append((index_of[point.name], index_of[point.sf]))
+
+        self.names = tuple(names)
+        self.struct = struct.Struct("".join(formats))
+        self.sentinels = tuple(sentinels)
+        self.strings = tuple(strings)
+        self.scaled = tuple(scaled)
+
+    def decode(self, data: bytes) -> dict[str, Any]:
+        """Decode the registers of the model, starting at its ID register."""
+        values = list(self.struct.unpack_from(data))
+        for index, sentinel in self.sentinels:
+            if values[index] == sentinel:
+                values[index] = None
+        for index in self.strings:
+            raw = values[index]
+            # Strings starting with a null are not implemented
+            values[index] = raw.split(b"\0", 1)[0].decode("utf-8", errors="ignore").rstrip() if raw[:1] != b"\0" else None
+        for index, sf_index in self.scaled:
+            value = values[index]
+            sf = values[sf_index]
+            if value is not None and sf:
+                values[index] = round(value * 10.0 ** sf, -sf)
+        return dict(zip(self.names, values))
+
+@lru_cache(maxsize=None)
+def get_decoder(model_id: int, model_len: int) -> Optional[ModelDecoder]:
+    """Return the decoder of a model, or None if its layout is not known."""
+    if model_id not in MODEL_POINTS:
+        return None
+    return ModelDecoder(model_id, model_len)
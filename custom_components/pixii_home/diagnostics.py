@@ -0,0 +1,47 @@
+"""Diagnostics support for Pixii Home."""
+from __future__ import annotations
+
+from typing import Any
+
+from homeassistant.components.diagnostics import async_redact_data
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.const import CONF_HOST
+from homeassistant.core import HomeAssistant
+
+from .const import DATA_PROXIES, DOMAIN
+
+TO_REDACT = {CONF_HOST, "SN", "serial_number"}
+
+async def async_get_config_entry_diagnostics(hass: HomeAssistant, entry: ConfigEntry) -> dict[str, Any]:
+    """Return diagnostics for a config entry, including the raw SunSpec models."""
+    return {
+        "entry": async_redact_data(entry.as_dict(), TO_REDACT),
+        "proxy": proxy.stats if (proxy := hass.data.get(DATA_PROXIES, {}).get(entry.entry_id)) else None,
+        "units": {
+            str(unit_id): _unit_diagnostics(coordinator)
+            for unit_id, coordinator in hass.data[DOMAIN][entry.entry_id].items()
+        },
+    }
+
+def _unit_diagnostics(coordinator) -> dict[str, Any]:
+    """Return the diagnostics of one unit."""
+    reader = coordinator.reader
+    snapshot = coordinator.data
+
+    return {
+        "device": {
+            "transport": reader.transport,
+            "unit_id": reader.unit_id,
+            "base_addr": reader.base_addr,
+            "layout": [list(model) for model in reader.layout or ()],
+            "firmware_version": reader.firmware_version,
+            "capture": reader.capture.path if reader.capture is not None else None,
+        },
+        "connection": reader.health,
+        "metrics": reader.metrics.summary(),
+        "samples": coordinator.samples.window() if coordinator.samples is not None else None,
+        "models": {
+            str(model_id): async_redact_data(dict(model), TO_REDACT)
+            for model_id, model in (snapshot.models.items() if snapshot else ())
+        },
+    }
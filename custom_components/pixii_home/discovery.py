@@ -0,0 +1,89 @@
+"""Discovery of SunSpec devices on the local network for Pixii Home."""
+from __future__ import annotations
+
+import asyncio
+import ipaddress
+import logging
+import struct
+from typing import NamedTuple, Optional, Sequence
+
+from .const import MODEL_COMMON, SUNSPEC_BASE_ADDRESSES, SUNSPEC_MARKER
+from .decoder import get_decoder
+from .modbus_tcp import ModbusError, ModbusExceptionResponse, ModbusTcpClient, ModbusTimeoutError
+
+_LOGGER = logging.getLogger(__name__)
+
+class DiscoveredDevice(NamedTuple):
+    """A SunSpec device that answered a probe, with the nameplate of its common model."""
+
+    host: str
+    port: int
+    unit_id: int
+    base_addr: int
+    manufacturer: Optional[str]
+    model: Optional[str]
+    serial_number: Optional[str]
+
+async def _async_probe_unit(client: ModbusTcpClient, unit_id: int) -> Optional[DiscoveredDevice]:
+    """Look for the SunS marker of one unit and read its common model."""
+    for base_addr in SUNSPEC_BASE_ADDRESSES:
+        try:
+            # The marker and the header of the first model, which is always the common model
+            data = await client.async_read_holding_registers(base_addr, 4, unit_id)
+        except ModbusExceptionResponse:
+            continue
+        if data[:4] != SUNSPEC_MARKER:
+            continue
+        model_id, model_len = struct.unpack(">HH", data[4:8])
+        info = {}
+        decoder = get_decoder(model_id, model_len) if model_id == MODEL_COMMON else None
+        if decoder is not None:
+            info = decoder.decode(await client.async_read_holding_registers(base_addr + 2, model_len + 2, unit_id))
+        return DiscoveredDevice(
+            client.host, client.port, unit_id, base_addr, info.get("Mn"), info.get("Md"), info.get("SN")
+        )
+    return None
+
+async def async_probe_host(host: str, port: int, unit_ids: Sequence[int], timeout: float) -> list[DiscoveredDevice]:
+    """Return the SunSpec devices answering on the given unit IDs of one host."""
+    client = ModbusTcpClient(host, port, timeout)
+    try:
+        await client.async_connect()
+    except ModbusError:
+        return []
+
+    devices = []
+    try:
+        for unit_id in unit_ids:
+            try:
+                device = await _async_probe_unit(client, unit_id)
+            except ModbusTimeoutError:
+                continue
+            if device is not None:
+                devices.append(device)
+    except ModbusError as err:
+        _LOGGER.debug("Probing %s:%s failed: %s", host, port, err)
+    finally:
+        await client.async_close()
+    return devices
+
+async def async_discover(
+    network: str, port: int, unit_ids: Sequence[int], timeout: float, concurrency: int, max_hosts: int
+) -> list[DiscoveredDevice]:
+    """Probe all hosts of a network concurrently and return the SunSpec devices found.
+
+    Hosts that do not accept the connection cost at most one timeout, so a
+    /24 network is scanned in a few timeouts with the default concurrency.
+    """
+    hosts = ipaddress.ip_network(network, strict=False)
+    if hosts.num_addresses > max_hosts:
+        raise ValueError(f"{network} has more than {max_hosts} addresses")
+
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def probe(host: str) -> list[DiscoveredDevice]:
+        async with semaphore:
+            return await async_probe_host(host, port, unit_ids, timeout)
+
+    results = await asyncio.gather(*(probe(str(host)) for host in hosts.hosts()))
+    return [device for devices in results for device in devices]
@@ -0,0 +1,92 @@
+"""Energy accumulation for Pixii Home."""
+from __future__ import annotations
+
+import logging
+from typing import Optional
+
+_LOGGER = logging.getLogger(__name__)
+
+# acc32 counters wrap around at 2^32
+ACC32_MODULUS = 1 << 32
+
+class EnergyAccumulator:
+    """Energy totals in Wh, accumulated from the values of every poll.
+
+    Battery power is integrated with the trapezoidal rule into charged
+    (positive power) and discharged (negative power) energy; intervals longer
+    than max_gap, like a gateway outage, are skipped instead of being
+    interpolated. Inverter energy follows the increments of the 32-bit WH
+    counter, across wraparounds and counter resets.
+    """
+
+    def __init__(self, max_gap: float):
+        """Initialize."""
+        self.max_gap = max_gap
+        self.charged = 0.0
+        self.discharged = 0.0
+        self.inverter = 0.0
+        self.inverter_counter: Optional[float] = None
+        self._last_power: Optional[float] = None
+        self._last_time: Optional[float] = None
+
+    def add_battery_power(self, power: Optional[float], now: float) -> None:
+        """Integrate the battery power since the previous sample, in W at monotonic time now."""
+        if power is None:
+            self._last_power = None
+            return
+        if self._last_power is not None and 0 < now - self._last_time <= self.max_gap:
+            hours = (now - self._last_time) / 3600
+            last = self._last_power
+            if (last >= 0) == (power >= 0):
+                self._add_battery_energy((last + power) / 2 * hours)
+            else:
+                # Split the interval where the power crosses zero
+                crossing = last / (last - power)
+                self._add_battery_energy(last / 2 * hours * crossing)
+                self._add_battery_energy(power / 2 * hours * (1 - crossing))
+        self._last_power = power
+        self._last_time = now
+
+    def _add_battery_energy(self, energy: float) -> None:
+        if energy >= 0:
+            self.charged += energy
+        else:
+            self.discharged -= energy
+
+    def add_inverter_counter(self, counter: Optional[float], sf: Optional[int]) -> None:
+        """Add the increment of the inverter WH counter, given with its scale factor applied."""
+        if counter is None:
+            return
+        last = self.inverter_counter
+        if last is None:
+            self.inverter_counter = counter
+            return
+
+        modulus = ACC32_MODULUS * 10 ** (sf or 0)
+        delta = (counter - last) % modulus
+        if delta > modulus / 2:
+            # The counter went backwards: a drop towards zero is a reset, anything else is a glitch
+            # that is ignored, keeping the previous counter so the way back up is not counted again
+            if counter >= last / 2:
+                _LOGGER.debug("Ignoring inverter energy counter going back from %s to %s Wh", last, counter)
+                return
+            _LOGGER.info("Inverter energy counter reset from %s to %s Wh", last, counter)
+            delta = counter
+        self.inverter_counter = counter
+        self.inverter += delta
+
+    def as_dict(self) -> dict:
+        """Return the totals to persist."""
+        return {
+            "charged": self.charged,
+            "discharged": self.discharged,
+            "inverter": self.inverter,
+            "inverter_counter": self.inverter_counter,
+        }
+
+    def restore(self, data: dict) -> None:
+        """Continue from persisted totals."""
+        self.charged = data.get("charged", 0.0)
+        self.discharged = data.get("discharged", 0.0)
+        self.inverter = data.get("inverter", 0.0)
+        self.inverter_counter = data.get("inverter_counter")
@@ -0,0 +1,107 @@
+"""Poll instrumentation for Pixii Home."""
+from __future__ import annotations
+
+from collections import deque
+from typing import Optional
+
+# Polls kept for the latency percentiles
+LATENCY_WINDOW = 100
+
+# MBAP header, function code and byte count in front of the registers of a read response
+READ_RESPONSE_OVERHEAD = 9
+
+def _percentile(ordered: list[float], percentile: float) -> float:
+    """Return the nearest-rank percentile of sorted values."""
+    return ordered[min(len(ordered) - 1, int(round(percentile / 100 * (len(ordered) - 1))))]
+
+class PollMetrics:
+    """Cost of the polls of one device.
+
+    Counters are cumulative since the integration started; the transaction,
+    register and byte counts of the last poll are kept separately, and the
+    latency percentiles cover the last LATENCY_WINDOW polls.
+    """
+
+    def __init__(self):
+        """Initialize."""
+        self.polls = 0
+        self.failures = 0
+        self.transactions = 0
+        self.registers = 0
+        self.bytes = 0
+        self.writes = 0
+        self.timeouts = 0
+        self.reconnects = 0
+        self.scans = 0
+        self.executor_time = 0.0
+        self.loop_time = 0.0
+        self.poll_interval: Optional[float] = None
+        self.latencies: deque[float] = deque(maxlen=LATENCY_WINDOW)
+        self.last_poll = {"transactions": 0, "registers": 0, "bytes": 0}
+        self._poll_start = (0, 0, 0)
+        self._latency_summary: Optional[dict] = None
+
+    def record_read(self, registers: int) -> None:
+        """Count one Modbus read transaction."""
+        self.transactions += 1
+        self.registers += registers
+        self.bytes += registers * 2 + READ_RESPONSE_OVERHEAD
+
+    def record_write(self) -> None:
+        """Count one Modbus write transaction."""
+        self.transactions += 1
+        self.writes += 1
+
+    def begin_poll(self) -> None:
+        """Mark the start of a poll."""
+        self._poll_start = (self.transactions, self.registers, self.bytes)
+
+    def end_poll(self, latency: float, success: bool) -> None:
+        """Record the outcome and latency of a poll, in seconds."""
+        self.polls += 1
+        if not success:
+            self.failures += 1
+        self.latencies.append(latency)
+        transactions, registers, read_bytes = self._poll_start
+        self.last_poll = {
+            "transactions": self.transactions - transactions,
+            "registers": self.registers - registers,
+            "bytes": self.bytes - read_bytes,
+        }
+        self._latency_summary = None
+
+    def set_poll_interval(self, seconds: float) -> None:
+        """Record the effective interval until the next poll."""
+        self.poll_interval = seconds
+
+    def summary(self) -> dict:
+        """Return all metrics, with latencies and times in milliseconds.
+
+        Counters are read on every call; only the latency percentiles, which
+        change once per poll, are cached.
+        """
+        if self._latency_summary is None:
+            ordered = sorted(self.latencies)
+            self._latency_summary = {
+                "latency_p50": round(_percentile(ordered, 50) * 1000, 1) if ordered else None,
+                "latency_p95": round(_percentile(ordered, 95) * 1000, 1) if ordered else None,
+                "latency_max": round(ordered[-1] * 1000, 1) if ordered else None,
+            }
+        return {
+            "polls": self.polls,
+            "failures": self.failures,
+            **self._latency_summary,
+            "transactions_per_poll": self.last_poll["transactions"],
+            "registers_per_poll": self.last_poll["registers"],
+            "bytes_per_poll": self.last_poll["bytes"],
+            "transactions": self.transactions,
+            "registers": self.registers,
+            "bytes": self.bytes,
+            "writes": self.writes,
+            "timeouts": self.timeouts,
+            "reconnects": self.reconnects,
+            "scans": self.scans,
+            "executor_time": round(self.executor_time * 1000, 1),
+            "loop_time": round(self.loop_time * 1000, 1),
+            "poll_interval": self.poll_interval,
+        }
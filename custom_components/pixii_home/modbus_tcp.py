@@ -0,0 +1,202 @@
+"""Asyncio Modbus TCP client for Pixii Home."""
+from __future__ import annotations
+
+import asyncio
+import logging
+import struct
+import time
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from .connection import Backoff
+
+_LOGGER = logging.getLogger(__name__)
+
+FUNC_READ_HOLDING_REGISTERS = 0x03
+FUNC_WRITE_MULTIPLE_REGISTERS = 0x10
+MAX_READ_COUNT = 125
+MAX_WRITE_COUNT = 123
+
+MBAP_HEADER = struct.Struct(">HHHB")
+
+class ModbusError(Exception):
+    """Base class for Modbus transport errors."""
+
+class ModbusConnectionError(ModbusError):
+    """Error to indicate the connection to the device failed or was lost."""
+
+class ModbusReconnectPending(ModbusConnectionError):
+    """Error to indicate no reconnect was attempted because the backoff delay has not passed."""
+
+class ModbusTimeoutError(ModbusError):
+    """Error to indicate the device did not answer in time."""
+
+class ModbusExceptionResponse(ModbusError):
+    """Error to indicate the device answered with a Modbus exception."""
+
+    def __init__(self, function: int, code: int):
+        """Initialize."""
+        super().__init__(f"Modbus exception {code} for function {function:#04x}")
+        self.function = function
+        self.code = code
+
+class ModbusTcpClient:
+    """Non-blocking Modbus TCP client using one persistent connection.
+
+    Responses are matched to requests by their transaction ID, so replies to
+    requests that already timed out are discarded instead of being returned to
+    the next caller. With a backoff, every request made while the delay after
+    a failed connection attempt has not passed fails without reconnecting.
+    """
+
+    def __init__(
+        self, host: str, port: int, timeout: float = 3.0, max_in_flight: int = 1, backoff: Backoff | None = None
+    ):
+        """Initialize."""
+        self.host = host
+        self.port = port
+        self.timeout = timeout
+        self._reader: asyncio.StreamReader | None = None
+        self._writer: asyncio.StreamWriter | None = None
+        self._receive_task: asyncio.Task | None = None
+        self._pending: dict[int, asyncio.Future] = {}
+        self._transaction_id = 0
+        self.connection_count = 0
+        self._connect_lock = asyncio.Lock()
+        self._in_flight = asyncio.Semaphore(max_in_flight)
+        self.backoff = backoff
+        self._reconnect_at = 0.0
+
+    @property
+    def connected(self) -> bool:
+        """Return True if the socket is open."""
+        return self._writer is not None and not self._writer.is_closing()
+
+    async def async_connect(self) -> None:
+        """Open the connection unless it is already open."""
+        async with self._connect_lock:
+            if self.connected:
+                return
+            now = time.monotonic()
+            if now < self._reconnect_at:
+                raise ModbusReconnectPending(
+                    f"Waiting {self._reconnect_at - now:.1f} s before reconnecting to {self.host}:{self.port}"
+                )
+            try:
+                self._reader, self._writer = await asyncio.wait_for(
+                    asyncio.open_connection(self.host, self.port), self.timeout
+                )
+            except (OSError, asyncio.TimeoutError) as err:
+                if self.backoff is not None:
+                    self._reconnect_at = time.monotonic() + self.backoff.next_delay()
+                raise ModbusConnectionError(f"Unable to connect to {self.host}:{self.port}: {err}") from err
+            if self.backoff is not None:
+                self.backoff.reset()
+            self._reconnect_at = 0.0
+            self._receive_task = asyncio.create_task(self._receive_loop(self._reader))
+            self.connection_count += 1
+            _LOGGER.debug("Connected to Modbus TCP device at %s:%s", self.host, self.port)
+
+    async def async_close(self) -> None:
+        """Close the connection and fail all outstanding requests."""
+        writer, self._writer = self._writer, None
+        self._reader = None
+        if self._receive_task is not None:
+            self._receive_task.cancel()
+            self._receive_task = None
+        self._fail_pending(ModbusConnectionError("Connection closed"))
+        if writer is not None:
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except OSError:
+                pass
+
+    async def async_read_holding_registers(self, address: int, count: int, unit_id: int = 1) -> bytes:
+        """Read a block of holding registers and return the raw register bytes."""
+        if not 0 < count <= MAX_READ_COUNT:
+            raise ValueError(f"Register count must be between 1 and {MAX_READ_COUNT}, got {count}")
+        response = await self._async_request(unit_id, struct.pack(">BHH", FUNC_READ_HOLDING_REGISTERS, address, count))
+        if len(response) < 2 or response[1] != count * 2 or len(response) != count * 2 + 2:
+            raise ModbusError(f"Malformed response reading {count} registers at {address}")
+        return response[2:]
+
+    async def async_write_registers(self, address: int, data: bytes, unit_id: int = 1) -> None:
+        """Write raw register bytes to a block of holding registers."""
+        count = len(data) // 2
+        if len(data) % 2 or not 0 < count <= MAX_WRITE_COUNT:
+            raise ValueError(f"Register count must be between 1 and {MAX_WRITE_COUNT}, got {len(data) / 2}")
+        response = await self._async_request(
+            unit_id, struct.pack(">BHHB", FUNC_WRITE_MULTIPLE_REGISTERS, address, count, len(data)) + data
+        )
+        if response[1:] != struct.pack(">HH", address, count):
+            raise ModbusError(f"Malformed response writing {count} registers at {address}")
+
+    async def _async_request(self, unit_id: int, pdu: bytes) -> bytes:
+        """Send one request PDU and wait for the matching response PDU."""
+        response = await self.async_forward(unit_id, pdu)
+        if response[0] == pdu[0] | 0x80:
+            raise ModbusExceptionResponse(pdu[0], response[1] if len(response) > 1 else 0)
+        if response[0] != pdu[0]:
+            raise ModbusError(f"Unexpected function code {response[0]:#04x} in response")
+        return response
+
+    async def async_forward(self, unit_id: int, pdu: bytes) -> bytes:
+        """Send any request PDU and return the response PDU as is, including exception responses."""
+        await self.async_connect()
+        async with self._in_flight:
+            if not self.connected:
+                raise ModbusConnectionError("Connection closed")
+            self._transaction_id = (self._transaction_id + 1) & 0xFFFF
+            transaction_id = self._transaction_id
+            future = asyncio.get_running_loop().create_future()
+            self._pending[transaction_id] = future
+            try:
+                self._writer.write(MBAP_HEADER.pack(transaction_id, 0, len(pdu) + 1, unit_id) + pdu)
+                await self._writer.drain()
+                response_unit, response = await asyncio.wait_for(future, self.timeout)
+            except asyncio.TimeoutError as err:
+                raise ModbusTimeoutError(
+                    f"Timeout waiting for {self.host}:{self.port} (transaction {transaction_id})"
+                ) from err
+            except OSError as err:
+                await self.async_close()
+                raise ModbusConnectionError(f"Connection to {self.host}:{self.port} lost: {err}") from err
+            finally:
+                self._pending.pop(transaction_id, None)
+
+        if response_unit != unit_id:
+            raise ModbusError(f"Response for unit {response_unit}, expected {unit_id}")
+        if not response:
+            raise ModbusError("Empty response")
+        return response
+
+    async def _receive_loop(self, reader: asyncio.StreamReader) -> None:
+        """Dispatch incoming frames to the waiting requests."""
+        try:
+            while True:
+                header = await reader.readexactly(MBAP_HEADER.size)
+                transaction_id, protocol_id, length, unit_id = MBAP_HEADER.unpack(header)
+                pdu = await reader.readexactly(length - 1)
+                future = self._pending.get(transaction_id)
+                if protocol_id != 0 or future is None or future.done():
+                    _LOGGER.debug("Discarding stale Modbus response for transaction %s", transaction_id)
+                    continue
+                future.set_result((unit_id, pdu))
+        except asyncio.CancelledError:
+            raise
+        except (OSError, asyncio.IncompleteReadError) as err:
+            _LOGGER.debug("Connection to %s:%s closed: %s", self.host, self.port, err)
+        if self._reader is reader:
+            self._writer.close()
+            self._writer = None
+            self._reader = None
+            self._receive_task = None
+        self._fail_pending(ModbusConnectionError(f"Connection to {self.host}:{self.port} lost"))
+
+    def _fail_pending(self, err: Exception) -> None:
+        """Fail all requests waiting for a response."""
+        for future in self._pending.values():
+            if not future.done():
+                future.set_exception(err)
+        self._pending.clear()
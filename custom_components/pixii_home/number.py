@@ -0,0 +1,76 @@
+"""Platform for number integration."""
+from __future__ import annotations
+
+import logging
+
+from homeassistant.components.number import NumberEntity, NumberMode
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.core import HomeAssistant
+from homeassistant.helpers.entity import DeviceInfo, EntityCategory
+from homeassistant.helpers.entity_platform import AddEntitiesCallback
+from homeassistant.helpers.update_coordinator import CoordinatorEntity
+
+from .const import DOMAIN, MODEL_BATTERY
+from .controls import CONTROL_NUMBERS
+from .coordinator import PixiiHomeDataCoordinator
+from .sunspec_models import MODEL_POINTS
+
+_LOGGER = logging.getLogger(__name__)
+
+# Largest raw value of the uint16 control registers
+MAX_REGISTER_VALUE = 0xFFFE
+
+async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry, async_add_entities: AddEntitiesCallback) -> None:
+    """Set up the Pixii Home number platform."""
+    async_add_entities(
+        PixiiHomeControlNumber(coordinator, control)
+        for coordinator in hass.data[DOMAIN][entry.entry_id].values()
+        for control in CONTROL_NUMBERS
+    )
+
+class PixiiHomeControlNumber(CoordinatorEntity, NumberEntity):
+    """Representation of a writable point of the battery model."""
+
+    _attr_entity_category = EntityCategory.CONFIG
+    _attr_mode = NumberMode.BOX
+
+    def __init__(self, coordinator: PixiiHomeDataCoordinator, control):
+        """Initialize the number."""
+        super().__init__(coordinator)
+        self._control = control
+        self._attr_name = f"Pixii Home {control.name}"
+        self._attr_unique_id = f"{DOMAIN}_{coordinator.unit_key}_{control.key}"
+        self._attr_native_unit_of_measurement = control.unit
+        self._attr_native_min_value = control.minimum
+        self._attr_native_step = control.step
+
+    @property
+    def available(self) -> bool:
+        """Return True if the point was read from the device."""
+        battery = self.coordinator.data.battery if self.coordinator.data else None
+        return super().available and battery is not None and battery.get(self._control.point) is not None
+
+    @property
+    def native_value(self):
+        """Return the value of the point."""
+        battery = self.coordinator.data.battery if self.coordinator.data else None
+        return battery.get(self._control.point) if battery else None
+
+    @property
+    def native_max_value(self) -> float:
+        """Return the configured maximum, or the largest value the register can hold."""
+        if self._control.maximum is not None:
+            return self._control.maximum
+        battery = self.coordinator.data.battery if self.coordinator.data else None
+        sf_point = MODEL_POINTS[MODEL_BATTERY][self._control.point].sf
+        sf = battery.get(sf_point) if battery else None
+        return MAX_REGISTER_VALUE * 10 ** (sf or 0)
+
+    async def async_set_native_value(self, value: float) -> None:
+        """Write the point to the device."""
+        await self.coordinator.async_write_controls({self._control.point: value})
+
+    @property
+    def device_info(self) -> DeviceInfo:
+        """Return device information about this Pixii Home device."""
+        return self.coordinator.device_info
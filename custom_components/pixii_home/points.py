@@ -0,0 +1,176 @@
+"""Declarative table of the SunSpec points exposed as Pixii Home sensors."""
+from __future__ import annotations
+
+from typing import Any, Callable, Mapping, NamedTuple, Optional
+
+from homeassistant.components.sensor import SensorDeviceClass, SensorStateClass
+from homeassistant.const import (
+    ELECTRIC_CURRENT_AMPERE,
+    ELECTRIC_POTENTIAL_VOLT,
+    ENERGY_KILO_WATT_HOUR,
+    FREQUENCY_HERTZ,
+    PERCENTAGE,
+    POWER_VOLT_AMPERE,
+    POWER_WATT,
+    TEMP_CELSIUS,
+)
+
+from .const import (
+    CONF_EXPANDED_POINTS,
+    MODEL_BATTERY,
+    MODEL_COMMON,
+    MODEL_INVERTER,
+    TIER_FAST,
+    TIER_MEDIUM,
+    TIER_SLOW,
+    TIERS,
+)
+
+class SensorPoint(NamedTuple):
+    """A sensor derived from the points of one SunSpec model.
+
+    The value is the point itself, or what transform(value, model) makes of
+    it; rows without a point derive their value from the whole model. The
+    tier is the fastest polling tier of the points the value depends on, so
+    the value is only re-evaluated when that tier was read. Rows with an
+    option are only created when that config option is enabled.
+    """
+
+    key: str
+    name: str
+    model_id: int
+    point: Optional[str]
+    device_class: Optional[str]
+    unit: Optional[str]
+    state_class: Optional[str] = SensorStateClass.MEASUREMENT
+    transform: Optional[Callable[[Any, Mapping[str, Any]], Any]] = None
+    tier: str = TIER_FAST
+    attributes: Optional[Callable[[Mapping[str, Any]], dict]] = None
+    missing: Any = None
+    option: Optional[str] = None
+
+def _charging(value, model):
+    return max(value, 0) if value is not None else None
+
+def _discharging(value, model):
+    return abs(min(value, 0)) if value is not None else None
+
+def _kwh(wh_rating, soc):
+    return round(wh_rating * soc / 100 / 1000, 2)
+
+def _available_energy(value, model):
+    if model.get("WHRtg") is None or model.get("SoC") is None:
+        return None
+    return _kwh(model["WHRtg"], model["SoC"])
+
+def _available_energy_attributes(model):
+    return {
+        "total_capacity_kwh": round((model.get("WHRtg") or 0) / 1000, 2),
+        "state_of_charge_percent": model.get("SoC", 0),
+    }
+
+def _usable_energy(value, model):
+    if any(model.get(point) is None for point in ("WHRtg", "SoC", "SoCRsvMin")):
+        return None
+    return _kwh(model["WHRtg"], max(model["SoC"] - model["SoCRsvMin"], 0))
+
+def _usable_energy_attributes(model):
+    return {
+        "current_soc_percent": model.get("SoC", 0),
+        "min_soc_percent": model.get("SoCRsvMin", 0),
+        "max_soc_percent": model.get("SocRsvMax", 0),
+        "total_capacity_kwh": round((model.get("WHRtg") or 0) / 1000, 2),
+    }
+
+def _info(value, model):
+    return f"{model.get('Mn', 'Unknown')} {model.get('Md', 'Unknown')}"
+
+def _info_attributes(model):
+    return {
+        "manufacturer": model.get("Mn", "Unknown"),
+        "model": model.get("Md", "Unknown"),
+        "version": model.get("Vr", "Unknown"),
+        "serial_number": model.get("SN", "Unknown"),
+    }
+
+def _online(value, model):
+    return "Online"
+
+SENSOR_POINTS = [
+    SensorPoint("battery", "Battery", MODEL_BATTERY, "SoC", SensorDeviceClass.BATTERY, PERCENTAGE),
+    SensorPoint("charging_power", "Charging Power", MODEL_BATTERY, "W", SensorDeviceClass.POWER, POWER_WATT, transform=_charging),
+    SensorPoint("discharging_power", "Discharging Power", MODEL_BATTERY, "W", SensorDeviceClass.POWER, POWER_WATT, transform=_discharging),
+    SensorPoint(
+        "available_energy", "Available Energy", MODEL_BATTERY, None, SensorDeviceClass.ENERGY, ENERGY_KILO_WATT_HOUR,
+        transform=_available_energy, attributes=_available_energy_attributes,
+    ),
+    SensorPoint(
+        "usable_energy", "Usable Energy Left", MODEL_BATTERY, None, SensorDeviceClass.ENERGY, ENERGY_KILO_WATT_HOUR,
+        transform=_usable_energy, attributes=_usable_energy_attributes,
+    ),
+    SensorPoint("info", "Info", MODEL_COMMON, None, SensorDeviceClass.ENUM, None, None, _info, TIER_SLOW, _info_attributes),
+    SensorPoint("inverter", "Inverter", MODEL_INVERTER, None, SensorDeviceClass.ENUM, None, None, _online, missing="Offline"),
+    SensorPoint("frequency", "Frequency", MODEL_INVERTER, "Hz", SensorDeviceClass.FREQUENCY, FREQUENCY_HERTZ),
+    SensorPoint("cabinet_temp", "Cabinet Temperature", MODEL_INVERTER, "TmpCab", SensorDeviceClass.TEMPERATURE, TEMP_CELSIUS, tier=TIER_MEDIUM),
+    SensorPoint("transformer_temp", "Transformer Temperature", MODEL_INVERTER, "TmpTrns", SensorDeviceClass.TEMPERATURE, TEMP_CELSIUS, tier=TIER_MEDIUM),
+    SensorPoint("state", "State", MODEL_INVERTER, "St", SensorDeviceClass.ENUM, None, None, tier=TIER_MEDIUM),
+    SensorPoint("vendor_state", "Vendor State", MODEL_INVERTER, "StVnd", SensorDeviceClass.ENUM, None, None, tier=TIER_MEDIUM),
+    SensorPoint("firmware_version", "Firmware Version", MODEL_COMMON, "Vr", SensorDeviceClass.ENUM, None, None, tier=TIER_SLOW),
+    # Individual points, created when expanded points are enabled
+    SensorPoint("inverter_current", "Inverter Current", MODEL_INVERTER, "A", SensorDeviceClass.CURRENT, ELECTRIC_CURRENT_AMPERE, option=CONF_EXPANDED_POINTS),
+    SensorPoint("inverter_current_a", "Inverter Current Phase A", MODEL_INVERTER, "AphA", SensorDeviceClass.CURRENT, ELECTRIC_CURRENT_AMPERE, option=CONF_EXPANDED_POINTS),
+    SensorPoint("inverter_current_b", "Inverter Current Phase B", MODEL_INVERTER, "AphB", SensorDeviceClass.CURRENT, ELECTRIC_CURRENT_AMPERE, option=CONF_EXPANDED_POINTS),
+    SensorPoint("inverter_current_c", "Inverter Current Phase C", MODEL_INVERTER, "AphC", SensorDeviceClass.CURRENT, ELECTRIC_CURRENT_AMPERE, option=CONF_EXPANDED_POINTS),
+    SensorPoint("inverter_voltage_a", "Inverter Voltage Phase A", MODEL_INVERTER, "PhVphA", SensorDeviceClass.VOLTAGE, ELECTRIC_POTENTIAL_VOLT, option=CONF_EXPANDED_POINTS),
+    SensorPoint("inverter_voltage_b", "Inverter Voltage Phase B", MODEL_INVERTER, "PhVphB", SensorDeviceClass.VOLTAGE, ELECTRIC_POTENTIAL_VOLT, option=CONF_EXPANDED_POINTS),
+    SensorPoint("inverter_voltage_c", "Inverter Voltage Phase C", MODEL_INVERTER, "PhVphC", SensorDeviceClass.VOLTAGE, ELECTRIC_POTENTIAL_VOLT, option=CONF_EXPANDED_POINTS),
+    SensorPoint("inverter_power", "Inverter Power", MODEL_INVERTER, "W", SensorDeviceClass.POWER, POWER_WATT, option=CONF_EXPANDED_POINTS),
+    SensorPoint("inverter_apparent_power", "Inverter Apparent Power", MODEL_INVERTER, "VA", SensorDeviceClass.APPARENT_POWER, POWER_VOLT_AMPERE, option=CONF_EXPANDED_POINTS),
+    SensorPoint("inverter_dc_current", "Inverter DC Current", MODEL_INVERTER, "DCA", SensorDeviceClass.CURRENT, ELECTRIC_CURRENT_AMPERE, option=CONF_EXPANDED_POINTS),
+    SensorPoint("inverter_dc_voltage", "Inverter DC Voltage", MODEL_INVERTER, "DCV", SensorDeviceClass.VOLTAGE, ELECTRIC_POTENTIAL_VOLT, option=CONF_EXPANDED_POINTS),
+    SensorPoint("inverter_dc_power", "Inverter DC Power", MODEL_INVERTER, "DCW", SensorDeviceClass.POWER, POWER_WATT, option=CONF_EXPANDED_POINTS),
+    SensorPoint("battery_voltage", "Battery Voltage", MODEL_BATTERY, "V", SensorDeviceClass.VOLTAGE, ELECTRIC_POTENTIAL_VOLT, option=CONF_EXPANDED_POINTS),
+    SensorPoint("battery_current", "Battery Current", MODEL_BATTERY, "A", SensorDeviceClass.CURRENT, ELECTRIC_CURRENT_AMPERE, option=CONF_EXPANDED_POINTS),
+    SensorPoint("battery_power", "Battery Power", MODEL_BATTERY, "W", SensorDeviceClass.POWER, POWER_WATT, option=CONF_EXPANDED_POINTS),
+    SensorPoint("battery_soh", "Battery State of Health", MODEL_BATTERY, "SoH", None, PERCENTAGE, tier=TIER_MEDIUM, option=CONF_EXPANDED_POINTS),
+    SensorPoint("battery_heartbeat", "Battery Heartbeat", MODEL_BATTERY, "Hb", None, None, tier=TIER_MEDIUM, option=CONF_EXPANDED_POINTS),
+]
+
+def enabled_points(options: Mapping[str, Any]) -> list[SensorPoint]:
+    """Return the rows of the sensors to create with the given config entry options."""
+    return [point for point in SENSOR_POINTS if point.option is None or options.get(point.option, False)]
+
+def compile_extractor(points: list[SensorPoint]):
+    """Build a function that evaluates the values and attributes of all rows in one pass.
+
+    The function takes a snapshot, the polling tiers read for it and the
+    previous result, and returns new (values, attributes) dicts keyed by row
+    key. Rows whose tier was not read keep their previous value.
+    """
+    rows_by_tier = {tier: [] for tier in TIERS}
+    for point in points:
+        rows_by_tier[point.tier].append(
+            (point.key, point.model_id, point.point, point.transform, point.attributes, point.missing)
+        )
+    rows_by_tier = {tier: tuple(rows) for tier, rows in rows_by_tier.items() if rows}
+
+    def extract(snapshot, tiers, previous=None):
+        values, attributes = ({}, {}) if previous is None else (dict(previous[0]), dict(previous[1]))
+        models = snapshot.models
+        for tier, rows in rows_by_tier.items():
+            if previous is not None and tier not in tiers:
+                continue
+            for key, model_id, name, transform, attributes_of, missing in rows:
+                model = models.get(model_id)
+                if model is None:
+                    values[key] = missing
+                    if attributes_of is not None:
+                        attributes[key] = {}
+                    continue
+                value = model.get(name) if name is not None else None
+                values[key] = transform(value, model) if transform is not None else value
+                if attributes_of is not None:
+                    attributes[key] = attributes_of(model)
+        return values, attributes
+
+    return extract
@@ -0,0 +1,157 @@
+"""Caching Modbus TCP proxy for Pixii Home."""
+from __future__ import annotations
+
+import asyncio
+import logging
+import struct
+from typing import Mapping, Optional
+
+from .modbus_tcp import (
+    FUNC_READ_HOLDING_REGISTERS,
+    FUNC_WRITE_MULTIPLE_REGISTERS,
+    MAX_READ_COUNT,
+    MBAP_HEADER,
+    ModbusError,
+    ModbusTcpClient,
+    ModbusTimeoutError,
+)
+from .sunspec_reader import SunSpecReader
+
+_LOGGER = logging.getLogger(__name__)
+
+FUNC_WRITE_SINGLE_REGISTER = 0x06
+
+# Read coils, discrete inputs, holding registers and input registers, forwarded even when writes are not
+READ_FUNCTIONS = frozenset((0x01, 0x02, FUNC_READ_HOLDING_REGISTERS, 0x04))
+
+# Modbus exception codes returned by the proxy itself
+EXCEPTION_ILLEGAL_FUNCTION = 0x01
+EXCEPTION_ILLEGAL_DATA_VALUE = 0x03
+EXCEPTION_GATEWAY_PATH_UNAVAILABLE = 0x0A
+EXCEPTION_GATEWAY_TARGET_FAILED = 0x0B
+
+# Largest PDU of a Modbus TCP frame
+MAX_PDU_LENGTH = 253
+
+def _exception(function: int, code: int) -> bytes:
+    """Return an exception response PDU."""
+    return bytes((function | 0x80, code))
+
+class ModbusProxy:
+    """Modbus TCP server answering reads from the register images of the polled units.
+
+    Read holding registers requests are served from the image of the unit
+    when every requested register was polled within max_age seconds, or
+    belongs to a slower polling tier that is still current. Cache misses and
+    other reads are forwarded to the gateway over the integration's own
+    connection, so the gateway only ever sees one client. Writes are refused
+    unless allow_writes is set; forwarded writes drop the cached registers.
+    """
+
+    def __init__(
+        self,
+        client: Optional[ModbusTcpClient],
+        readers: Mapping[int, SunSpecReader],
+        max_age: float,
+        allow_writes: bool = False,
+    ):
+        """Initialize."""
+        self.client = client
+        self.readers = readers
+        self.max_age = max_age
+        self.allow_writes = allow_writes
+        self.requests = 0
+        self.hits = 0
+        self.forwarded = 0
+        self.rejected = 0
+        self.clients = 0
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._connections: set[asyncio.StreamWriter] = set()
+
+    async def async_start(self, host: str, port: int) -> None:
+        """Start listening for Modbus TCP clients."""
+        self._server = await asyncio.start_server(self._handle_connection, host, port)
+        _LOGGER.info("Modbus TCP proxy listening on %s:%s", host, port)
+
+    async def async_stop(self) -> None:
+        """Stop listening and disconnect all clients."""
+        server, self._server = self._server, None
+        if server is not None:
+            server.close()
+        for writer in list(self._connections):
+            writer.close()
+        self._connections.clear()
+        if server is not None:
+            await server.wait_closed()
+
+    @property
+    def stats(self) -> dict:
+        """Return the request counters of the proxy."""
+        return {
+            "clients": self.clients,
+            "requests": self.requests,
+            "hits": self.hits,
+            "forwarded": self.forwarded,
+            "rejected": self.rejected,
+            "max_age": self.max_age,
+            "allow_writes": self.allow_writes,
+        }
+
+    async def _handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        """Answer the requests of one client in order."""
+        self._connections.add(writer)
+        self.clients += 1
+        try:
+            while True:
+                header = await reader.readexactly(MBAP_HEADER.size)
+                transaction_id, protocol_id, length, unit_id = MBAP_HEADER.unpack(header)
+                if protocol_id != 0 or not 2 <= length <= MAX_PDU_LENGTH + 1:
+                    _LOGGER.debug("Closing proxy client sending an invalid Modbus TCP frame")
+                    break
+                pdu = await reader.readexactly(length - 1)
+                response = await self._async_handle_request(unit_id, pdu)
+                writer.write(MBAP_HEADER.pack(transaction_id, 0, len(response) + 1, unit_id) + response)
+                await writer.drain()
+        except (OSError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            self.clients -= 1
+            self._connections.discard(writer)
+            writer.close()
+
+    async def _async_handle_request(self, unit_id: int, pdu: bytes) -> bytes:
+        """Return the response PDU to one request."""
+        self.requests += 1
+        function = pdu[0]
+        unit = self.readers.get(unit_id)
+        if function == FUNC_READ_HOLDING_REGISTERS:
+            if len(pdu) != 5:
+                return _exception(function, EXCEPTION_ILLEGAL_DATA_VALUE)
+            address, count = struct.unpack_from(">HH", pdu, 1)
+            if not 0 < count <= MAX_READ_COUNT:
+                return _exception(function, EXCEPTION_ILLEGAL_DATA_VALUE)
+            data = unit.read_cached_registers(address, count, self.max_age) if unit is not None else None
+            if data is not None:
+                self.hits += 1
+                return bytes((function, count * 2)) + data
+
+        if function not in READ_FUNCTIONS and not self.allow_writes:
+            self.rejected += 1
+            return _exception(function, EXCEPTION_ILLEGAL_FUNCTION)
+        if self.client is None:
+            return _exception(function, EXCEPTION_GATEWAY_PATH_UNAVAILABLE)
+        self.forwarded += 1
+        try:
+            response = await self.client.async_forward(unit_id, pdu)
+        except ModbusTimeoutError:
+            return _exception(function, EXCEPTION_GATEWAY_TARGET_FAILED)
+        except ModbusError as err:
+            _LOGGER.debug("Forwarding proxy request failed: %s", err)
+            return _exception(function, EXCEPTION_GATEWAY_PATH_UNAVAILABLE)
+
+        if unit is not None and len(pdu) >= 5:
+            if function == FUNC_WRITE_SINGLE_REGISTER:
+                unit.invalidate_registers(struct.unpack_from(">H", pdu, 1)[0], 1)
+            elif function == FUNC_WRITE_MULTIPLE_REGISTERS:
+                unit.invalidate_registers(*struct.unpack_from(">HH", pdu, 1))
+        return response
@@ -0,0 +1,122 @@
+"""Register read planning and buffering for Pixii Home."""
+from __future__ import annotations
+
+from array import array
+from typing import Iterable, NamedTuple, Optional
+
+from .modbus_tcp import MAX_READ_COUNT
+
+# Registers between two ranges that are read anyway instead of issuing another request
+DEFAULT_MAX_GAP = 32
+
+class ReadBlock(NamedTuple):
+    """One Modbus read request."""
+
+    start: int
+    count: int
+
+    @property
+    def end(self) -> int:
+        """Return the address after the last register of the block."""
+        return self.start + self.count
+
+def plan_reads(
+    ranges: Iterable[tuple[int, int]],
+    max_gap: int = DEFAULT_MAX_GAP,
+    max_count: int = MAX_READ_COUNT,
+) -> list[ReadBlock]:
+    """Return the fewest read requests covering the given (start, count) ranges.
+
+    Ranges that overlap, touch or are separated by at most max_gap registers
+    are merged, and the merged spans are split at the max_count limit of a
+    single Modbus request.
+    """
+    spans: list[list[int]] = []
+    for start, end in sorted((start, start + count) for start, count in ranges if count > 0):
+        if spans and start - spans[-1][1] <= max_gap:
+            spans[-1][1] = max(spans[-1][1], end)
+        else:
+            spans.append([start, end])
+
+    blocks = []
+    for start, end in spans:
+        while start < end:
+            count = min(end - start, max_count)
+            blocks.append(ReadBlock(start, count))
+            start += count
+    return blocks
+
+def format_plan(blocks: list[ReadBlock]) -> str:
+    """Return a short description of a read plan for logging."""
+    registers = sum(block.count for block in blocks)
+    ranges = ", ".join(f"{block.start}-{block.end - 1}" for block in blocks)
+    return f"{len(blocks)} requests, {registers} registers [{ranges}]"
+
+class RegisterImage:
+    """Contiguous copy of the holding registers covered by a read plan.
+
+    The time each register was last read is kept alongside, so callers can
+    ask for registers no older than a given age. Registers that are polled
+    less often, like scale factors, can be given a longer lifetime during
+    which they count as fresh whatever age the caller asks for.
+    """
+
+    def __init__(self, start: int, count: int):
+        """Initialize."""
+        self.start = start
+        self.count = count
+        self._data = bytearray(count * 2)
+        self._times = array("d", bytes(count * 8))
+        self._lifetimes = array("d", bytes(count * 8))
+
+    @classmethod
+    def for_blocks(cls, blocks: list[ReadBlock]) -> RegisterImage:
+        """Create an image spanning all blocks of a read plan."""
+        start = min(block.start for block in blocks)
+        return cls(start, max(block.end for block in blocks) - start)
+
+    def update(self, addr: int, data: bytes, timestamp: float = 0.0) -> None:
+        """Store registers read from the device at the given monotonic time."""
+        offset = (addr - self.start) * 2
+        if offset < 0 or offset + len(data) > len(self._data):
+            raise ValueError(f"Registers {addr}+{len(data) // 2} are outside the image")
+        self._data[offset:offset + len(data)] = data
+        count = len(data) // 2
+        self._times[offset // 2:offset // 2 + count] = array("d", [timestamp]) * count
+
+    def invalidate(self, addr: int, count: int) -> None:
+        """Mark registers as never read, for example after they were written."""
+        start = max(addr - self.start, 0)
+        end = min(addr - self.start + count, self.count)
+        if start < end:
+            self._times[start:end] = array("d", bytes((end - start) * 8))
+
+    def set_lifetime(self, addr: int, count: int, seconds: float) -> None:
+        """Let registers count as fresh for the given seconds after they were read."""
+        start = max(addr - self.start, 0)
+        end = min(addr - self.start + count, self.count)
+        if start < end:
+            self._lifetimes[start:end] = array("d", [seconds]) * (end - start)
+
+    def read(self, addr: int, count: int) -> bytes:
+        """Return registers from the image."""
+        offset = (addr - self.start) * 2
+        if offset < 0 or offset + count * 2 > len(self._data):
+            raise ValueError(f"Registers {addr}+{count} are outside the image")
+        return bytes(self._data[offset:offset + count * 2])
+
+    def read_fresh(self, addr: int, count: int, now: float, max_age: float) -> Optional[bytes]:
+        """Return registers that are all within max_age seconds or their lifetime at the monotonic time now, or None."""
+        offset = addr - self.start
+        if offset < 0 or count <= 0 or offset + count > self.count:
+            return None
+        times = self._times[offset:offset + count]
+        read_at = min(times)
+        if read_at <= 0:
+            return None
+        if now - read_at > max_age and any(
+            now - register_read_at > max(max_age, lifetime)
+            for register_read_at, lifetime in zip(times, self._lifetimes[offset:offset + count])
+        ):
+            return None
+        return bytes(self._data[offset * 2:(offset + count) * 2])
@@ -0,0 +1,69 @@
+"""Fixed-size sample buffers for high-rate sampling of live values."""
+from __future__ import annotations
+
+from array import array
+import math
+from typing import Any, Iterator, Mapping, Optional
+
+from .const import MODEL_BATTERY, MODEL_INVERTER
+
+# Points sampled at the sampling rate: key -> (model ID, point)
+SAMPLED_POINTS = {
+    "battery_power": (MODEL_BATTERY, "W"),
+    "inverter_power": (MODEL_INVERTER, "W"),
+    "frequency": (MODEL_INVERTER, "Hz"),
+    "inverter_current_a": (MODEL_INVERTER, "AphA"),
+    "inverter_current_b": (MODEL_INVERTER, "AphB"),
+    "inverter_current_c": (MODEL_INVERTER, "AphC"),
+}
+
+class SampleBuffer:
+    """Ring buffer of samples of a set of points, sharing one time axis.
+
+    All storage is preallocated as arrays of doubles, so memory use is fixed
+    by the buffer size no matter how many samples are appended. Missing
+    values are stored as NaN.
+    """
+
+    def __init__(self, keys, size: int):
+        """Initialize."""
+        self.size = size
+        self.count = 0
+        self.timestamps = array("d", bytes(8 * size))
+        self.series = {key: array("d", bytes(8 * size)) for key in keys}
+
+    def append(self, timestamp: float, values: Mapping[str, Any]) -> None:
+        """Store one sample of every point, overwriting the oldest once the buffer is full."""
+        index = self.count % self.size
+        self.timestamps[index] = timestamp
+        for key, series in self.series.items():
+            value = values.get(key)
+            series[index] = math.nan if value is None else value
+        self.count += 1
+
+    def _indices(self, since: int) -> Iterator[int]:
+        """Return the buffer indices of the samples appended since the given count, oldest first."""
+        start = max(since, self.count - self.size)
+        return (position % self.size for position in range(start, self.count))
+
+    def aggregate(self, key: str, since: int = 0) -> Optional[dict]:
+        """Return mean, min, max and last value of the samples of a point appended since the given count."""
+        series = self.series[key]
+        values = [series[index] for index in self._indices(since) if not math.isnan(series[index])]
+        if not values:
+            return None
+        return {
+            "mean": round(math.fsum(values) / len(values), 3),
+            "min": min(values),
+            "max": max(values),
+            "last": values[-1],
+            "samples": len(values),
+        }
+
+    def window(self) -> dict:
+        """Return all buffered samples, oldest first."""
+        indices = list(self._indices(0))
+        window = {"timestamps": [self.timestamps[index] for index in indices]}
+        for key, series in self.series.items():
+            window[key] = [None if math.isnan(series[index]) else series[index] for index in indices]
+        return window
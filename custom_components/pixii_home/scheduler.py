@@ -0,0 +1,56 @@
+"""Adaptive poll interval for Pixii Home."""
+from __future__ import annotations
+
+from typing import Any, Optional, Sequence
+
+# Power change rate in W/s that counts as a fast transition
+FAST_POWER_RATE = 100.0
+
+# Largest power change in W between two polls that counts as steady state
+STEADY_POWER_CHANGE = 50.0
+
+# Growth of the interval per steady poll, and on a timeout
+STEADY_FACTOR = 1.5
+BACKOFF_FACTOR = 2.0
+
+class AdaptiveInterval:
+    """Poll interval that follows how fast the battery and inverter change.
+
+    A fast power change or a changed inverter state drops the interval to
+    the minimum. Steady polls stretch it step by step up to the maximum, and
+    anything in between returns it to the base interval. Timeouts stretch
+    it as well, to take load off an overloaded gateway.
+    """
+
+    def __init__(self, base: float, minimum: float, maximum: float):
+        """Initialize."""
+        self.base = min(max(base, minimum), maximum)
+        self.minimum = minimum
+        self.maximum = maximum
+        self.interval = self.base
+        self._powers: Optional[Sequence[Optional[float]]] = None
+        self._state: Any = None
+        self._time: Optional[float] = None
+
+    def update(self, powers: Sequence[Optional[float]], state: Any, now: float) -> float:
+        """Return the next interval after a successful poll of the given power values and inverter state."""
+        if self._time is not None and now > self._time:
+            change = max(
+                (abs(power - last) for power, last in zip(powers, self._powers) if power is not None and last is not None),
+                default=0.0,
+            )
+            if state != self._state or change / (now - self._time) >= FAST_POWER_RATE:
+                self.interval = self.minimum
+            elif change <= STEADY_POWER_CHANGE:
+                self.interval = min(max(self.interval, self.base) * STEADY_FACTOR, self.maximum)
+            else:
+                self.interval = self.base
+        self._powers = powers
+        self._state = state
+        self._time = now
+        return self.interval
+
+    def back_off(self) -> float:
+        """Return the next interval after a poll timed out."""
+        self.interval = min(self.interval * BACKOFF_FACTOR, self.maximum)
+        return self.interval
@@ -0,0 +1,56 @@
+"""Platform for select integration."""
+from __future__ import annotations
+
+import logging
+
+from homeassistant.components.select import SelectEntity
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.core import HomeAssistant
+from homeassistant.helpers.entity import DeviceInfo, EntityCategory
+from homeassistant.helpers.entity_platform import AddEntitiesCallback
+from homeassistant.helpers.update_coordinator import CoordinatorEntity
+
+from .const import DOMAIN
+from .controls import CONTROL_MODE_KEY, CONTROL_MODE_POINT, CONTROL_MODES
+from .coordinator import PixiiHomeDataCoordinator
+
+_LOGGER = logging.getLogger(__name__)
+
+async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry, async_add_entities: AddEntitiesCallback) -> None:
+    """Set up the Pixii Home select platform."""
+    async_add_entities(
+        PixiiHomeControlModeSelect(coordinator) for coordinator in hass.data[DOMAIN][entry.entry_id].values()
+    )
+
+class PixiiHomeControlModeSelect(CoordinatorEntity, SelectEntity):
+    """Representation of the local or remote control mode of the battery."""
+
+    _attr_entity_category = EntityCategory.CONFIG
+    _attr_options = list(CONTROL_MODES.values())
+
+    def __init__(self, coordinator: PixiiHomeDataCoordinator):
+        """Initialize the select."""
+        super().__init__(coordinator)
+        self._attr_name = "Pixii Home Control Mode"
+        self._attr_unique_id = f"{DOMAIN}_{coordinator.unit_key}_{CONTROL_MODE_KEY}"
+
+    @property
+    def available(self) -> bool:
+        """Return True if the control mode was read from the device."""
+        return super().available and self.current_option is not None
+
+    @property
+    def current_option(self):
+        """Return the control mode."""
+        battery = self.coordinator.data.battery if self.coordinator.data else None
+        return CONTROL_MODES.get(battery.get(CONTROL_MODE_POINT)) if battery else None
+
+    async def async_select_option(self, option: str) -> None:
+        """Write the control mode to the device."""
+        value = next(value for value, name in CONTROL_MODES.items() if name == option)
+        await self.coordinator.async_write_controls({CONTROL_MODE_POINT: value})
+
+    @property
+    def device_info(self) -> DeviceInfo:
+        """Return device information about this Pixii Home device."""
+        return self.coordinator.device_info
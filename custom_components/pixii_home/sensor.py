@@ -2,376 +2,211 @@
 from __future__ import annotations
 
 import logging
+import time
 
 from homeassistant.components.sensor import (
+    RestoreSensor,
     SensorDeviceClass,
-    SensorEntity,
     SensorStateClass,
 )
 from homeassistant.config_entries import ConfigEntry
 from homeassistant.const import (
-    PERCENTAGE,
+    DATA_BYTES,
+    ELECTRIC_CURRENT_AMPERE,
     POWER_WATT,
     ENERGY_KILO_WATT_HOUR,
     FREQUENCY_HERTZ,
-    TEMP_CELSIUS,
+    TIME_MILLISECONDS,
+    TIME_SECONDS,
     __version__ as HA_VERSION,
 )
-from homeassistant.core import HomeAssistant
+from homeassistant.core import HomeAssistant, callback
 from homeassistant.helpers.entity_platform import AddEntitiesCallback
 from homeassistant.helpers.update_coordinator import CoordinatorEntity
-from homeassistant.helpers.entity import DeviceInfo
+from homeassistant.helpers.entity import DeviceInfo, EntityCategory
 
-from .const import DOMAIN
+from .const import DOMAIN, CONF_SAMPLING
 from .coordinator import PixiiHomeDataCoordinator
 
 _LOGGER = logging.getLogger(__name__)
 
+# Window aggregates of the sampled points, published in sampling mode:
+# (sample key, name, unique ID, device class, unit)
+SAMPLED_SENSORS = [
+    ("battery_power", "Battery Power Average", "battery_power_average", SensorDeviceClass.POWER, POWER_WATT),
+    ("inverter_power", "Inverter Power Average", "inverter_power_average", SensorDeviceClass.POWER, POWER_WATT),
+    ("frequency", "Frequency Average", "frequency_average", SensorDeviceClass.FREQUENCY, FREQUENCY_HERTZ),
+    ("inverter_current_a", "Inverter Current Phase A Average", "inverter_current_a_average", SensorDeviceClass.CURRENT, ELECTRIC_CURRENT_AMPERE),
+    ("inverter_current_b", "Inverter Current Phase B Average", "inverter_current_b_average", SensorDeviceClass.CURRENT, ELECTRIC_CURRENT_AMPERE),
+    ("inverter_current_c", "Inverter Current Phase C Average", "inverter_current_c_average", SensorDeviceClass.CURRENT, ELECTRIC_CURRENT_AMPERE),
+]
+
+# Poll metrics exposed as diagnostic sensors:
+# (metric, name, unique ID, device class, unit, state class, enabled by default)
+METRIC_SENSORS = [
+    ("latency_p50", "Poll Latency p50", "poll_latency_p50", SensorDeviceClass.DURATION, TIME_MILLISECONDS, SensorStateClass.MEASUREMENT, False),
+    ("latency_p95", "Poll Latency p95", "poll_latency_p95", SensorDeviceClass.DURATION, TIME_MILLISECONDS, SensorStateClass.MEASUREMENT, True),
+    ("latency_max", "Poll Latency Max", "poll_latency_max", SensorDeviceClass.DURATION, TIME_MILLISECONDS, SensorStateClass.MEASUREMENT, False),
+    ("transactions_per_poll", "Modbus Transactions per Poll", "poll_transactions", None, None, SensorStateClass.MEASUREMENT, True),
+    ("registers_per_poll", "Registers per Poll", "poll_registers", None, None, SensorStateClass.MEASUREMENT, False),
+    ("bytes_per_poll", "Bytes per Poll", "poll_bytes", None, DATA_BYTES, SensorStateClass.MEASUREMENT, False),
+    ("timeouts", "Modbus Timeouts", "modbus_timeouts", None, None, SensorStateClass.TOTAL_INCREASING, True),
+    ("reconnects", "Reconnects", "reconnects", None, None, SensorStateClass.TOTAL_INCREASING, True),
+    ("scans", "Device Scans", "scans", None, None, SensorStateClass.TOTAL_INCREASING, False),
+    ("executor_time", "Executor Time", "executor_time", SensorDeviceClass.DURATION, TIME_MILLISECONDS, SensorStateClass.TOTAL_INCREASING, False),
+    ("loop_time", "Event Loop Time", "loop_time", SensorDeviceClass.DURATION, TIME_MILLISECONDS, SensorStateClass.TOTAL_INCREASING, False),
+    ("poll_interval", "Poll Interval", "poll_interval", SensorDeviceClass.DURATION, TIME_SECONDS, SensorStateClass.MEASUREMENT, True),
+]
+
 async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry, async_add_entities: AddEntitiesCallback) -> None:
     """Set up the Pixii Home sensor platform."""
-    coordinator = hass.data[DOMAIN][entry.entry_id]
-    async_add_entities([
-        PixiiHomeBatterySensor(coordinator),
-        PixiiHomeChargingSensor(coordinator),
-        PixiiHomeDischargingSensor(coordinator),
-        PixiiHomeAvailableEnergySensor(coordinator),
-        PixiiHomeUsableEnergySensor(coordinator),
-        PixiiHomeInfoSensor(coordinator),
-        PixiiHomeInverterSensor(coordinator),
-        PixiiHomeFrequencySensor(coordinator),
-        PixiiHomeCabinetTempSensor(coordinator),
-        PixiiHomeTransformerTempSensor(coordinator),
-        PixiiHomeStateSensor(coordinator),
-        PixiiHomeVendorStateSensor(coordinator),
-        PixiiHomeFirmwareVersionSensor(coordinator),
-    ], True)
+    options = {**entry.data, **entry.options}
+    entities = []
+    for coordinator in hass.data[DOMAIN][entry.entry_id].values():
+        entities.extend(PixiiHomeSensor(coordinator, point) for point in coordinator.points)
+        entities.extend([
+            PixiiHomeEnergyTotalSensor(coordinator, "charged", "Battery Energy Charged", "battery_energy_charged"),
+            PixiiHomeEnergyTotalSensor(coordinator, "discharged", "Battery Energy Discharged", "battery_energy_discharged"),
+            PixiiHomeEnergyTotalSensor(coordinator, "inverter", "Inverter Energy", "inverter_energy"),
+        ])
+        if options.get(CONF_SAMPLING, False):
+            entities.extend(
+                PixiiHomeSampledSensor(coordinator, *sampled) for sampled in SAMPLED_SENSORS
+            )
+        entities.extend(PixiiHomeMetricSensor(coordinator, *metric) for metric in METRIC_SENSORS)
+    async_add_entities(entities)
+
+class PixiiHomeBaseSensor(CoordinatorEntity, RestoreSensor):
+    """Base class for Pixii Home sensors.
 
-class PixiiHomeBaseSensor(CoordinatorEntity, SensorEntity):
-    """Base class for Pixii Home sensors."""
+    Until the coordinator has data, sensors show the value restored from
+    the last run, so entities are usable while the device is still scanned.
+    """
 
     def __init__(self, coordinator: PixiiHomeDataCoordinator, name: str, unique_id: str):
         """Initialize the sensor."""
         super().__init__(coordinator)
         self._attr_name = name
-        self._attr_unique_id = f"{DOMAIN}_{unique_id}"
+        self._attr_unique_id = f"{DOMAIN}_{coordinator.unit_key}_{unique_id}"
         self._attr_device_class = SensorDeviceClass.POWER
         self._attr_state_class = SensorStateClass.MEASUREMENT
+        self._deadband = None
+        self._restored_value = None
+
+    async def async_added_to_hass(self) -> None:
+        """Restore the last state and set up change detection, starting from the state written when the entity is added."""
+        await super().async_added_to_hass()
+        if self.coordinator.data is None and (last_data := await self.async_get_last_sensor_data()) is not None:
+            self._restored_value = last_data.native_value
+        self._deadband = self.coordinator.deadband_for(self.device_class)
+        self._deadband.should_write(
+            self.native_value, (self.available, self.extra_state_attributes), time.monotonic()
+        )
+
+    @callback
+    def _handle_coordinator_update(self) -> None:
+        """Write the state only if it changed beyond the deadband or the heartbeat is due."""
+        if self._deadband is None or self._deadband.should_write(
+            self.native_value, (self.available, self.extra_state_attributes), time.monotonic()
+        ):
+            self.async_write_ha_state()
 
     @property
     def device_info(self) -> DeviceInfo:
         """Return device information about this Pixii Home device."""
-        info_data = self._get_info_data()
-        if info_data:
-            return DeviceInfo(
-                identifiers={(DOMAIN, self.coordinator.config_entry.entry_id)},
-                name="Pixii Home",
-                manufacturer=info_data.get("Mn", "Pixii"),
-                model=info_data.get("Md", "Battery"),
-                sw_version=info_data.get("Vr", "Unknown"),
-                hw_version=info_data.get("SN", "Unknown"),
-            )
-        return DeviceInfo(
-            identifiers={(DOMAIN, self.coordinator.config_entry.entry_id)},
-            name="Pixii Home",
-            manufacturer="Pixii",
-            model="Battery",
-        )
-
-    def _get_data(self, id):
-        """Get the data from the coordinator data."""
-        if not self.coordinator.data or 'models' not in self.coordinator.data:
-            return None
-        
-        # Find the model with ID 1
-        for model in self.coordinator.data['models']:
-            if model.get('ID') == id:
-                return model
-            
-        return None
-    
+        return self.coordinator.device_info
 
-    def _get_info_data(self):
-        return self._get_data(1)
-    
-    def _get_inverter_data(self):
-        return self._get_data(103)
+class PixiiHomeSensor(PixiiHomeBaseSensor):
+    """Representation of a row of the sensor point table."""
 
-    def _get_battery_data(self):
-        return self._get_data(802)
-
-class PixiiHomeBatterySensor(PixiiHomeBaseSensor):
-    """Representation of a Pixii Home Battery Sensor."""
-
-    def __init__(self, coordinator):
+    def __init__(self, coordinator, point):
         """Initialize the sensor."""
-        super().__init__(coordinator, "Pixii Home Battery", "battery")
-        self._attr_device_class = SensorDeviceClass.BATTERY
-        self._attr_native_unit_of_measurement = PERCENTAGE
+        super().__init__(coordinator, f"Pixii Home {point.name}", point.key)
+        self._key = point.key
+        self._has_attributes = point.attributes is not None
+        self._attr_device_class = point.device_class
+        self._attr_native_unit_of_measurement = point.unit
+        self._attr_state_class = point.state_class
 
     @property
     def native_value(self):
-        """Return the state of the sensor."""
-        battery_data = self._get_battery_data()
-        if battery_data:
-            return battery_data.get("SoC")
-        return None
+        """Return the value evaluated by the coordinator."""
+        return self.coordinator.values.get(self._key, self._restored_value)
 
     @property
     def extra_state_attributes(self):
-        """Return all attributes of the battery."""
-        return self._get_battery_data() or {}
-
-class PixiiHomeChargingSensor(PixiiHomeBaseSensor):
-    """Representation of a Pixii Home Charging Sensor."""
-
-    def __init__(self, coordinator):
-        """Initialize the sensor."""
-        super().__init__(coordinator, "Pixii Home Charging Power", "charging_power")
-        self._attr_native_unit_of_measurement = POWER_WATT
-
-    @property
-    def native_value(self):
-        """Return the state of the sensor."""
-        battery_data = self._get_battery_data()
-        if battery_data and "W" in battery_data:
-            power = battery_data["W"]
-            return max(power, 0)  # Only return positive values
+        """Return the attributes evaluated by the coordinator."""
+        if self._has_attributes:
+            return self.coordinator.attributes.get(self._key, {})
         return None
 
-class PixiiHomeDischargingSensor(PixiiHomeBaseSensor):
-    """Representation of a Pixii Home Discharging Sensor."""
+class PixiiHomeEnergyTotalSensor(PixiiHomeBaseSensor):
+    """Representation of an energy total accumulated by the coordinator."""
 
-    def __init__(self, coordinator):
+    def __init__(self, coordinator, total, name, unique_id):
         """Initialize the sensor."""
-        super().__init__(coordinator, "Pixii Home Discharging Power", "discharging_power")
-        self._attr_native_unit_of_measurement = POWER_WATT
-
-    @property
-    def native_value(self):
-        """Return the state of the sensor."""
-        battery_data = self._get_battery_data()
-        if battery_data and "W" in battery_data:
-            power = battery_data["W"]
-            return abs(min(power, 0))  # Return absolute value of negative power
-        return None
-
-class PixiiHomeAvailableEnergySensor(PixiiHomeBaseSensor):
-    """Representation of a Pixii Home Available Energy Sensor."""
-
-    def __init__(self, coordinator):
-        """Initialize the sensor."""
-        super().__init__(coordinator, "Pixii Home Available Energy", "available_energy")
-        self._attr_device_class = SensorDeviceClass.ENERGY
-        self._attr_native_unit_of_measurement = ENERGY_KILO_WATT_HOUR
-
-    @property
-    def native_value(self):
-        """Return the state of the sensor."""
-        battery_data = self._get_battery_data()
-        if battery_data and "WHRtg" in battery_data and "SoC" in battery_data:
-            wh_rating = battery_data["WHRtg"]
-            soc = battery_data["SoC"]
-            available_wh = (wh_rating * soc) / 100
-            return round(available_wh / 1000, 2)  # Convert Wh to kWh and round to 2 decimal places
-        return None
-
-    @property
-    def extra_state_attributes(self):
-        """Return extra state attributes."""
-        battery_data = self._get_battery_data()
-        if battery_data:
-            return {
-                "total_capacity_kwh": round(battery_data.get("WHRtg", 0) / 1000, 2),
-                "state_of_charge_percent": battery_data.get("SoC", 0)
-            }
-        return {}
-
-class PixiiHomeUsableEnergySensor(PixiiHomeBaseSensor):
-    """Representation of a Pixii Home Usable Energy Sensor."""
-
-    def __init__(self, coordinator):
-        """Initialize the sensor."""
-        super().__init__(coordinator, "Pixii Home Usable Energy Left", "usable_energy")
+        super().__init__(coordinator, f"Pixii Home {name}", unique_id)
+        self._total = total
         self._attr_device_class = SensorDeviceClass.ENERGY
         self._attr_native_unit_of_measurement = ENERGY_KILO_WATT_HOUR
+        self._attr_state_class = SensorStateClass.TOTAL_INCREASING
 
     @property
     def native_value(self):
-        """Return the state of the sensor."""
-        battery_data = self._get_battery_data()
-        if battery_data and all(key in battery_data for key in ["WHRtg", "SoC", "SoCRsvMin"]):
-            wh_rating = battery_data["WHRtg"]
-            current_soc = battery_data["SoC"]
-            min_soc = battery_data["SoCRsvMin"]
-            
-            usable_soc = max(current_soc - min_soc, 0)  # Ensure non-negative value
-            usable_wh = (wh_rating * usable_soc) / 100
-            return round(usable_wh / 1000, 2)  # Convert Wh to kWh and round to 2 decimal places
-        return None
-
-    @property
-    def extra_state_attributes(self):
-        """Return extra state attributes."""
-        battery_data = self._get_battery_data()
-        if battery_data:
-            return {
-                "current_soc_percent": battery_data.get("SoC", 0),
-                "min_soc_percent": battery_data.get("SoCRsvMin", 0),
-                "max_soc_percent": battery_data.get("SocRsvMax", 0),
-                "total_capacity_kwh": round(battery_data.get("WHRtg", 0) / 1000, 2),
-            }
-        return {}
+        """Return the total in kWh."""
+        return round(getattr(self.coordinator.energy, self._total) / 1000, 3)
 
-class PixiiHomeInfoSensor(PixiiHomeBaseSensor):
-    """Representation of a Pixii Home Info Sensor."""
+class PixiiHomeSampledSensor(PixiiHomeBaseSensor):
+    """Representation of the window aggregates of a sampled point."""
 
-    def __init__(self, coordinator):
+    def __init__(self, coordinator, key, name, unique_id, device_class, unit):
         """Initialize the sensor."""
-        super().__init__(coordinator, "Pixii Home Info", "info")
-        self._attr_device_class = SensorDeviceClass.ENUM
-        self._attr_native_unit_of_measurement = None
+        super().__init__(coordinator, f"Pixii Home {name}", unique_id)
+        self._key = key
+        self._attr_device_class = device_class
+        self._attr_native_unit_of_measurement = unit
 
     @property
     def native_value(self):
-        """Return the state of the sensor."""
-        info_data = self._get_info_data()
-        if info_data:
-            return f"{info_data.get('Mn', 'Unknown')} {info_data.get('Md', 'Unknown')}"
-        return None
+        """Return the mean of the samples of the last window."""
+        aggregate = self.coordinator.aggregates.get(self._key)
+        if aggregate:
+            return aggregate["mean"]
+        return None if self.coordinator.data else self._restored_value
 
     @property
     def extra_state_attributes(self):
-        """Return extra state attributes."""
-        info_data = self._get_info_data()
-        if info_data:
+        """Return minimum, maximum and last sample of the window."""
+        aggregate = self.coordinator.aggregates.get(self._key)
+        if aggregate:
             return {
-                "manufacturer": info_data.get("Mn", "Unknown"),
-                "model": info_data.get("Md", "Unknown"),
-                "version": info_data.get("Vr", "Unknown"),
-                "serial_number": info_data.get("SN", "Unknown")
+                "min": aggregate["min"],
+                "max": aggregate["max"],
+                "last": aggregate["last"],
+                "samples": aggregate["samples"],
             }
         return {}
 
-class PixiiHomeInverterSensor(PixiiHomeBaseSensor):
-    """Representation of a Pixii Home Inverter Sensor."""
-
-    def __init__(self, coordinator):
-        """Initialize the sensor."""
-        super().__init__(coordinator, "Pixii Home Inverter", "inverter")
-        self._attr_device_class = SensorDeviceClass.ENUM
-        self._attr_native_unit_of_measurement = None
-
-    @property
-    def native_value(self):
-        """Return the state of the sensor."""
-        inverter_data = self._get_inverter_data()
-        if inverter_data:
-            return "Online"
-        return "Offline"
-
-    @property
-    def extra_state_attributes(self):
-        """Return all attributes of the inverter."""
-        return self._get_inverter_data() or {}
+class PixiiHomeMetricSensor(PixiiHomeBaseSensor):
+    """Representation of a poll metric as a diagnostic Pixii Home sensor."""
 
-class PixiiHomeFrequencySensor(PixiiHomeBaseSensor):
-    """Representation of a Pixii Home Frequency Sensor."""
+    _attr_entity_category = EntityCategory.DIAGNOSTIC
 
-    def __init__(self, coordinator):
+    def __init__(self, coordinator, metric, name, unique_id, device_class, unit, state_class, enabled):
         """Initialize the sensor."""
-        super().__init__(coordinator, "Pixii Home Frequency", "frequency")
-        self._attr_device_class = SensorDeviceClass.FREQUENCY
-        self._attr_native_unit_of_measurement = FREQUENCY_HERTZ
+        super().__init__(coordinator, f"Pixii Home {name}", unique_id)
+        self._metric = metric
+        self._attr_device_class = device_class
+        self._attr_native_unit_of_measurement = unit
+        self._attr_state_class = state_class
+        self._attr_entity_registry_enabled_default = enabled
 
     @property
-    def native_value(self):
-        """Return the state of the sensor."""
-        inverter_data = self._get_inverter_data()
-        if inverter_data and "Hz" in inverter_data:
-            return inverter_data["Hz"]
-        return None
-
-class PixiiHomeCabinetTempSensor(PixiiHomeBaseSensor):
-    """Representation of a Pixii Home Cabinet Temperature Sensor."""
-
-    def __init__(self, coordinator):
-        """Initialize the sensor."""
-        super().__init__(coordinator, "Pixii Home Cabinet Temperature", "cabinet_temp")
-        self._attr_device_class = SensorDeviceClass.TEMPERATURE
-        self._attr_native_unit_of_measurement = TEMP_CELSIUS
-
-    @property
-    def native_value(self):
-        """Return the state of the sensor."""
-        inverter_data = self._get_inverter_data()
-        if inverter_data and "TmpCab" in inverter_data:
-            return inverter_data["TmpCab"]
-        return None
-
-class PixiiHomeTransformerTempSensor(PixiiHomeBaseSensor):
-    """Representation of a Pixii Home Transformer Temperature Sensor."""
-
-    def __init__(self, coordinator):
-        """Initialize the sensor."""
-        super().__init__(coordinator, "Pixii Home Transformer Temperature", "transformer_temp")
-        self._attr_device_class = SensorDeviceClass.TEMPERATURE
-        self._attr_native_unit_of_measurement = TEMP_CELSIUS
+    def available(self) -> bool:
+        """Return True, the metrics are most interesting when polls fail."""
+        return True
 
     @property
     def native_value(self):
-        """Return the state of the sensor."""
-        inverter_data = self._get_inverter_data()
-        if inverter_data and "TmpTrns" in inverter_data:
-            return inverter_data["TmpTrns"]
-        return None
-
-class PixiiHomeStateSensor(PixiiHomeBaseSensor):
-    """Representation of a Pixii Home State Sensor."""
-
-    def __init__(self, coordinator):
-        """Initialize the sensor."""
-        super().__init__(coordinator, "Pixii Home State", "state")
-        self._attr_device_class = SensorDeviceClass.ENUM
-        self._attr_native_unit_of_measurement = None
-
-    @property
-    def native_value(self):
-        """Return the state of the sensor."""
-        inverter_data = self._get_inverter_data()
-        if inverter_data and "St" in inverter_data:
-            return inverter_data["St"]
-        return None
-
-class PixiiHomeVendorStateSensor(PixiiHomeBaseSensor):
-    """Representation of a Pixii Home Vendor State Sensor."""
-
-    def __init__(self, coordinator):
-        """Initialize the sensor."""
-        super().__init__(coordinator, "Pixii Home Vendor State", "vendor_state")
-        self._attr_device_class = SensorDeviceClass.ENUM
-        self._attr_native_unit_of_measurement = None
-
-    @property
-    def native_value(self):
-        """Return the state of the sensor."""
-        inverter_data = self._get_inverter_data()
-        if inverter_data and "StVnd" in inverter_data:
-            return inverter_data["StVnd"]
-        return None
-
-class PixiiHomeFirmwareVersionSensor(PixiiHomeBaseSensor):
-    """Representation of a Pixii Home Firmware Version Sensor."""
-
-    def __init__(self, coordinator):
-        """Initialize the sensor."""
-        super().__init__(coordinator, "Pixii Home Firmware Version", "firmware_version")
-        self._attr_device_class = SensorDeviceClass.ENUM
-        self._attr_native_unit_of_measurement = None
-
-    @property
-    def native_value(self):
-        """Return the firmware version."""
-        info_data = self._get_info_data()
-        if info_data and "Vr" in info_data:
-            return info_data["Vr"]
-        return None
+        """Return the value of the metric."""
+        return self.coordinator.reader.metrics.summary().get(self._metric)
@@ -0,0 +1,71 @@
+"""Services of the Pixii Home integration."""
+from __future__ import annotations
+
+import logging
+
+import voluptuous as vol
+from homeassistant.const import ATTR_DEVICE_ID
+from homeassistant.core import HomeAssistant, ServiceCall, callback
+from homeassistant.exceptions import HomeAssistantError
+from homeassistant.helpers import config_validation as cv, device_registry as dr
+
+from .const import DOMAIN
+from .controls import CONTROL_MODE_KEY, CONTROL_MODE_POINT, CONTROL_MODES, CONTROL_NUMBERS
+
+_LOGGER = logging.getLogger(__name__)
+
+SERVICE_SET_BATTERY_CONTROL = "set_battery_control"
+
+SET_BATTERY_CONTROL_SCHEMA = vol.All(
+    vol.Schema(
+        {
+            vol.Required(ATTR_DEVICE_ID): cv.string,
+            vol.Optional(CONTROL_MODE_KEY): vol.In([mode.lower() for mode in CONTROL_MODES.values()]),
+            **{
+                vol.Optional(control.key): vol.All(
+                    vol.Coerce(float), vol.Range(min=control.minimum, max=control.maximum)
+                )
+                for control in CONTROL_NUMBERS
+            },
+        }
+    ),
+    cv.has_at_least_one_key(CONTROL_MODE_KEY, *(control.key for control in CONTROL_NUMBERS)),
+)
+
+def _coordinator_for_device(hass: HomeAssistant, device_id: str):
+    """Return the coordinator of the unit behind a device."""
+    device = dr.async_get(hass).async_get(device_id)
+    if device is not None:
+        for coordinators in hass.data.get(DOMAIN, {}).values():
+            for coordinator in coordinators.values():
+                if (DOMAIN, coordinator.unit_key) in device.identifiers:
+                    return coordinator
+    raise HomeAssistantError(f"Device {device_id} is not a loaded Pixii Home unit")
+
+@callback
+def async_setup_services(hass: HomeAssistant) -> None:
+    """Register the services of the integration, once for all config entries."""
+    if hass.services.has_service(DOMAIN, SERVICE_SET_BATTERY_CONTROL):
+        return
+
+    async def async_set_battery_control(call: ServiceCall) -> None:
+        """Write several control points of a unit in one go."""
+        coordinator = _coordinator_for_device(hass, call.data[ATTR_DEVICE_ID])
+        values = {}
+        if CONTROL_MODE_KEY in call.data:
+            values[CONTROL_MODE_POINT] = next(
+                value for value, mode in CONTROL_MODES.items() if mode.lower() == call.data[CONTROL_MODE_KEY]
+            )
+        for control in CONTROL_NUMBERS:
+            if control.key in call.data:
+                values[control.point] = call.data[control.key]
+        await coordinator.async_write_controls(values)
+
+    hass.services.async_register(
+        DOMAIN, SERVICE_SET_BATTERY_CONTROL, async_set_battery_control, schema=SET_BATTERY_CONTROL_SCHEMA
+    )
+
+@callback
+def async_unload_services(hass: HomeAssistant) -> None:
+    """Remove the services of the integration after the last config entry was unloaded."""
+    hass.services.async_remove(DOMAIN, SERVICE_SET_BATTERY_CONTROL)
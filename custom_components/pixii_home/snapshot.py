@@ -0,0 +1,40 @@
+"""Decoded device data shared by all Pixii Home entities."""
+from __future__ import annotations
+
+from types import MappingProxyType
+from typing import Any, Mapping, Optional
+
+from .const import MODEL_BATTERY, MODEL_COMMON, MODEL_INVERTER
+
+class PixiiHomeSnapshot:
+    """Immutable result of one coordinator refresh.
+
+    Models are indexed by their SunSpec ID and hold values with the scale
+    factors already applied, so entities only do dictionary lookups.
+    """
+
+    __slots__ = ("models", "info", "inverter", "battery")
+
+    def __init__(self, models: Mapping[int, Mapping[str, Any]]):
+        """Initialize."""
+        frozen = MappingProxyType({model_id: MappingProxyType(dict(model)) for model_id, model in models.items()})
+        object.__setattr__(self, "models", frozen)
+        object.__setattr__(self, "info", frozen.get(MODEL_COMMON))
+        object.__setattr__(self, "inverter", frozen.get(MODEL_INVERTER))
+        object.__setattr__(self, "battery", frozen.get(MODEL_BATTERY))
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        """Prevent changes, the snapshot is shared by all entities."""
+        raise AttributeError(f"{type(self).__name__} is immutable")
+
+    @classmethod
+    def from_reader_data(cls, data: Mapping[str, Any]) -> PixiiHomeSnapshot:
+        """Create a snapshot from the model list returned by the reader."""
+        models = {}
+        for model in data.get("models", ()):
+            models.setdefault(model.get("ID"), model)
+        return cls(models)
+
+    def model(self, model_id: int) -> Optional[Mapping[str, Any]]:
+        """Return the points of a model, or None if the device does not provide it."""
+        return self.models.get(model_id)
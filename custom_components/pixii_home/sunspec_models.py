@@ -0,0 +1,280 @@
+"""SunSpec register layouts of the models provided by Pixii gateways."""
+from __future__ import annotations
+
+import struct
+from typing import Any, Mapping, NamedTuple, Optional
+
+from .const import (
+    MODEL_BATTERY,
+    MODEL_COMMON,
+    MODEL_INVERTER,
+    TIER_FAST,
+    TIER_MEDIUM,
+    TIER_SLOW,
+)
+
+MODEL_AGGREGATOR = 2
+
+# Registers of the model ID and length header in front of every model
+MODEL_HEADER_LEN = 2
+
+TYPE_SIZES = {
+    "uint16": 1,
+    "int16": 1,
+    "acc16": 1,
+    "enum16": 1,
+    "bitfield16": 1,
+    "sunssf": 1,
+    "pad": 1,
+    "uint32": 2,
+    "int32": 2,
+    "acc32": 2,
+    "enum32": 2,
+    "bitfield32": 2,
+}
+
+# Raw register values that mark a point as not implemented
+NOT_IMPLEMENTED = {
+    "uint16": 0xFFFF,
+    "int16": 0x8000,
+    "acc16": 0,
+    "enum16": 0xFFFF,
+    "bitfield16": 0xFFFF,
+    "sunssf": 0x8000,
+    "pad": 0x8000,
+    "uint32": 0xFFFFFFFF,
+    "int32": 0x80000000,
+    "acc32": 0,
+    "enum32": 0xFFFFFFFF,
+    "bitfield32": 0xFFFFFFFF,
+}
+
+SIGNED_TYPES = {"int16", "sunssf", "int32"}
+
+class Point(NamedTuple):
+    """A point of a SunSpec model.
+
+    The offset is counted in registers from the model ID register.
+    """
+
+    name: str
+    type: str
+    offset: int
+    size: int
+    sf: Optional[str] = None
+
+def _points(*specs) -> dict[str, Point]:
+    """Lay out points in register order, as listed in the SunSpec model definition."""
+    points = {}
+    offset = MODEL_HEADER_LEN
+    for spec in specs:
+        name, point_type = spec[0], spec[1]
+        sf = spec[2] if len(spec) > 2 else None
+        size = spec[3] if len(spec) > 3 else TYPE_SIZES[point_type]
+        points[name] = Point(name, point_type, offset, size, sf)
+        offset += size
+    return points
+
+MODEL_POINTS: dict[int, dict[str, Point]] = {
+    MODEL_COMMON: _points(
+        ("Mn", "string", None, 16),
+        ("Md", "string", None, 16),
+        ("Opt", "string", None, 8),
+        ("Vr", "string", None, 8),
+        ("SN", "string", None, 16),
+        ("DA", "uint16"),
+    ),
+    MODEL_AGGREGATOR: _points(
+        ("AID", "uint16"),
+        ("N", "uint16"),
+        ("UN", "uint16"),
+        ("St", "enum16"),
+        ("StVnd", "enum16"),
+        ("Evt", "bitfield32"),
+        ("EvtVnd", "bitfield32"),
+        ("Ctl", "enum16"),
+        ("CtlVnd", "enum32"),
+        ("CtlVl", "enum32"),
+    ),
+    MODEL_INVERTER: _points(
+        ("A", "uint16", "A_SF"),
+        ("AphA", "uint16", "A_SF"),
+        ("AphB", "uint16", "A_SF"),
+        ("AphC", "uint16", "A_SF"),
+        ("A_SF", "sunssf"),
+        ("PPVphAB", "uint16", "V_SF"),
+        ("PPVphBC", "uint16", "V_SF"),
+        ("PPVphCA", "uint16", "V_SF"),
+        ("PhVphA", "uint16", "V_SF"),
+        ("PhVphB", "uint16", "V_SF"),
+        ("PhVphC", "uint16", "V_SF"),
+        ("V_SF", "sunssf"),
+        ("W", "int16", "W_SF"),
+        ("W_SF", "sunssf"),
+        ("Hz", "uint16", "Hz_SF"),
+        ("Hz_SF", "sunssf"),
+        ("VA", "int16", "VA_SF"),
+        ("VA_SF", "sunssf"),
+        ("VAr", "int16", "VAr_SF"),
+        ("VAr_SF", "sunssf"),
+        ("PF", "int16", "PF_SF"),
+        ("PF_SF", "sunssf"),
+        ("WH", "acc32", "WH_SF"),
+        ("WH_SF", "sunssf"),
+        ("DCA", "uint16", "DCA_SF"),
+        ("DCA_SF", "sunssf"),
+        ("DCV", "uint16", "DCV_SF"),
+        ("DCV_SF", "sunssf"),
+        ("DCW", "int16", "DCW_SF"),
+        ("DCW_SF", "sunssf"),
+        ("TmpCab", "int16", "Tmp_SF"),
+        ("TmpSnk", "int16", "Tmp_SF"),
+        ("TmpTrns", "int16", "Tmp_SF"),
+        ("TmpOt", "int16", "Tmp_SF"),
+        ("Tmp_SF", "sunssf"),
+        ("St", "enum16"),
+        ("StVnd", "enum16"),
+        ("Evt1", "bitfield32"),
+        ("Evt2", "bitfield32"),
+        ("EvtVnd1", "bitfield32"),
+        ("EvtVnd2", "bitfield32"),
+        ("EvtVnd3", "bitfield32"),
+        ("EvtVnd4", "bitfield32"),
+    ),
+    MODEL_BATTERY: _points(
+        ("AHRtg", "uint16", "AHRtg_SF"),
+        ("WHRtg", "uint16", "WHRtg_SF"),
+        ("WChaRteMax", "uint16", "WChaDisChaMax_SF"),
+        ("WDisChaRteMax", "uint16", "WChaDisChaMax_SF"),
+        ("DisChaRte", "uint16", "DisChaRte_SF"),
+        ("SoCMax", "uint16", "SoC_SF"),
+        ("SoCMin", "uint16", "SoC_SF"),
+        ("SocRsvMax", "uint16", "SoC_SF"),
+        ("SoCRsvMin", "uint16", "SoC_SF"),
+        ("SoC", "uint16", "SoC_SF"),
+        ("DoD", "uint16", "DoD_SF"),
+        ("SoH", "uint16", "SoH_SF"),
+        ("NCyc", "uint32"),
+        ("ChaSt", "enum16"),
+        ("LocRemCtl", "enum16"),
+        ("Hb", "uint16"),
+        ("CtrlHb", "uint16"),
+        ("AlmRst", "uint16"),
+        ("Typ", "enum16"),
+        ("State", "enum16"),
+        ("StateVnd", "enum16"),
+        ("WarrDt", "uint32"),
+        ("Evt1", "bitfield32"),
+        ("Evt2", "bitfield32"),
+        ("EvtVnd1", "bitfield32"),
+        ("EvtVnd2", "bitfield32"),
+        ("V", "uint16", "V_SF"),
+        ("VMax", "uint16", "V_SF"),
+        ("VMin", "uint16", "V_SF"),
+        ("CellVMax", "uint16", "CellV_SF"),
+        ("CellVMaxStr", "uint16"),
+        ("CellVMaxMod", "uint16"),
+        ("CellVMin", "uint16", "CellV_SF"),
+        ("CellVMinStr", "uint16"),
+        ("CellVMinMod", "uint16"),
+        ("CellVAvg", "uint16", "CellV_SF"),
+        ("A", "int16", "A_SF"),
+        ("AChaMax", "uint16", "AMax_SF"),
+        ("ADisChaMax", "uint16", "AMax_SF"),
+        ("W", "int16", "W_SF"),
+        ("ReqInvState", "enum16"),
+        ("ReqW", "int16", "W_SF"),
+        ("SetOp", "enum16"),
+        ("SetInvState", "enum16"),
+        ("AHRtg_SF", "sunssf"),
+        ("WHRtg_SF", "sunssf"),
+        ("WChaDisChaMax_SF", "sunssf"),
+        ("DisChaRte_SF", "sunssf"),
+        ("SoC_SF", "sunssf"),
+        ("DoD_SF", "sunssf"),
+        ("SoH_SF", "sunssf"),
+        ("V_SF", "sunssf"),
+        ("CellV_SF", "sunssf"),
+        ("A_SF", "sunssf"),
+        ("AMax_SF", "sunssf"),
+        ("W_SF", "sunssf"),
+    ),
+}
+
+# Live values polled at the fast rate
+FAST_POINTS = {
+    MODEL_INVERTER: {
+        "A", "AphA", "AphB", "AphC",
+        "PPVphAB", "PPVphBC", "PPVphCA", "PhVphA", "PhVphB", "PhVphC",
+        "W", "Hz", "VA", "VAr", "PF", "WH", "DCA", "DCV", "DCW",
+    },
+    MODEL_BATTERY: {"SoC", "W", "A", "V"},
+}
+
+# Nameplate values that only change with the hardware or firmware
+STATIC_POINTS = {
+    MODEL_BATTERY: {
+        "AHRtg", "WHRtg", "WChaRteMax", "WDisChaRteMax", "SoCMax", "SoCMin",
+        "AChaMax", "ADisChaMax", "Typ", "WarrDt",
+    },
+}
+
+def point_tier(model_id: int, point: Point) -> str:
+    """Return the polling tier of a point."""
+    if model_id == MODEL_COMMON or point.type == "sunssf" or point.name in STATIC_POINTS.get(model_id, ()):
+        return TIER_SLOW
+    if point.name in FAST_POINTS.get(model_id, ()):
+        return TIER_FAST
+    return TIER_MEDIUM
+
+def tier_ranges(model_id: int, model_addr: int, model_len: int) -> dict[str, list[tuple[int, int]]]:
+    """Return the (start, count) register ranges of a model grouped by polling tier.
+
+    Models without a known layout are polled as a whole at the medium rate,
+    and the model header is only re-read together with the static data.
+    """
+    points = MODEL_POINTS.get(model_id)
+    if points is None:
+        return {
+            TIER_SLOW: [(model_addr, MODEL_HEADER_LEN)],
+            TIER_MEDIUM: [(model_addr + MODEL_HEADER_LEN, model_len)],
+        }
+
+    ranges: dict[str, list[tuple[int, int]]] = {TIER_SLOW: [(model_addr, MODEL_HEADER_LEN)]}
+    for point in points.values():
+        if point.offset + point.size > model_len + MODEL_HEADER_LEN:
+            continue
+        ranges.setdefault(point_tier(model_id, point), []).append((model_addr + point.offset, point.size))
+    return ranges
+
+def encode_model(model_id: int, values: Mapping[str, Any], model_len: Optional[int] = None) -> bytes:
+    """Encode point values into the registers of a model, including its header.
+
+    Values are given as decoded by the reader, with scale factors applied;
+    None encodes the not implemented value of the point type.
+    """
+    points = MODEL_POINTS[model_id]
+    if model_len is None:
+        last = list(points.values())[-1]
+        model_len = last.offset + last.size - MODEL_HEADER_LEN
+    data = bytearray((model_len + MODEL_HEADER_LEN) * 2)
+    struct.pack_into(">HH", data, 0, model_id, model_len)
+    for point in points.values():
+        if point.offset + point.size > model_len + MODEL_HEADER_LEN:
+            continue
+        data[point.offset * 2:(point.offset + point.size) * 2] = encode_point(
+            point, values.get(point.name), values.get(point.sf) if point.sf else None
+        )
+    return bytes(data)
+
+def encode_point(point: Point, value: Any, sf: Optional[int] = None) -> bytes:
+    """Encode the value of one point into raw register bytes."""
+    if point.type == "string":
+        return (value or "").encode("utf-8")[:point.size * 2].ljust(point.size * 2, b"\0")
+    if value is None:
+        raw = NOT_IMPLEMENTED[point.type]
+    else:
+        raw = int(round(value / 10 ** sf)) if sf is not None else int(value)
+        if point.type in SIGNED_TYPES and raw < 0:
+            raw += 1 << (16 * point.size)
+    return raw.to_bytes(point.size * 2, "big")
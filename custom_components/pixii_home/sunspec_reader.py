@@ -1,71 +1,748 @@
-import sunspec2.modbus.client as client
+import asyncio
 import json
 import logging
-from typing import List, Optional
+import struct
+import time
+from typing import Any, List, Mapping, NamedTuple, Optional
 from homeassistant.core import HomeAssistant
 from homeassistant.exceptions import HomeAssistantError
+from homeassistant.helpers.storage import Store
+from homeassistant.util import dt as dt_util
+
+from .capture import CaptureWriter
+from .commands import PRIORITY_NORMAL, CommandQueue
+from .connection import STATE_HALF_OPEN, Backoff, CircuitBreaker
+from .const import (
+    CIRCUIT_BREAKER_FAILURES,
+    CIRCUIT_BREAKER_MAX_DELAY,
+    CIRCUIT_BREAKER_MIN_DELAY,
+    CAPTURE_FLUSH_BYTES,
+    CAPTURE_FLUSH_INTERVAL,
+    DEFAULT_TRANSPORT,
+    DEFAULT_UNIT_ID,
+    LAYOUT_STORAGE_KEY,
+    LAYOUT_STORAGE_VERSION,
+    MODBUS_TIMEOUT,
+    MODEL_COMMON,
+    POLLED_MODELS,
+    RECONNECT_MAX_DELAY,
+    RECONNECT_MIN_DELAY,
+    SUNSPEC_BASE_ADDRESSES,
+    SUNSPEC_END_MODEL_ID,
+    SUNSPEC_MARKER,
+    TIERS,
+    TRANSPORT_NATIVE,
+)
+from .decoder import get_decoder
+from .metrics import PollMetrics
+from .modbus_tcp import (
+    MAX_READ_COUNT,
+    ModbusConnectionError,
+    ModbusExceptionResponse,
+    ModbusReconnectPending,
+    ModbusTcpClient,
+    ModbusTimeoutError,
+)
+from .registers import RegisterImage, format_plan, plan_reads
+from .sunspec_models import MODEL_POINTS, encode_point, tier_ranges
 
 _LOGGER = logging.getLogger(__name__)
 
+# Register offsets of the common model (1) string points, relative to the model ID register
+COMMON_VR_OFFSET = 42
+COMMON_VR_LEN = 8
+COMMON_SN_OFFSET = 50
+COMMON_SN_LEN = 16
+
+def _decode_string(data: bytes, offset: int, length: int) -> Optional[str]:
+    """Decode a SunSpec string point from raw register data, None if it is not implemented."""
+    raw = data[offset * 2:(offset + length) * 2]
+    if raw[:1] == b"\0":
+        return None
+    return raw.split(b"\0", 1)[0].decode("utf-8", errors="ignore").rstrip()
+
+class ModelLayout(NamedTuple):
+    """Location of a model decoded by the fast decoder, in place of a pysunspec2 model."""
+
+    model_id: int
+    model_addr: int
+    model_len: int
+
 class SunSpecReader:
-    def __init__(self, hass: HomeAssistant, host: str, port: int):
+    def __init__(
+        self,
+        hass: HomeAssistant,
+        host: str,
+        port: int,
+        entry_id: Optional[str] = None,
+        transport: str = DEFAULT_TRANSPORT,
+        model_ids=POLLED_MODELS,
+        unit_id: int = DEFAULT_UNIT_ID,
+        client: Optional[ModbusTcpClient] = None,
+        capture: Optional[CaptureWriter] = None,
+    ):
         self.hass = hass
         self.host = host
         self.port = port
+        self.unit_id = unit_id
+        self.transport = transport
+        self.model_ids = tuple(model_ids)
+        # A client passed in is shared with the other units of the gateway and closed by its owner
+        self.client: Optional[ModbusTcpClient] = client
+        self._shared_client = client is not None
         self.device = None
         self.models = {}
+        self.base_addr = None
+        self.layout: Optional[List[tuple]] = None
+        self.serial_number = None
+        self.firmware_version = None
+        self._store = None
+        self._layout_saved = False
+        self._tier_ranges = {}
+        self._read_plans = {}
+        self._decoded = {}
+        self._image: Optional[RegisterImage] = None
+        self._image_valid = False
+        self._connection_count = 0
+        self.tiers_read = frozenset()
+        self.tier_lifetimes = {}
+        self.commands = CommandQueue()
+        self.capture = capture
+        self._capture_flushed = time.monotonic()
+        self.metrics = PollMetrics()
+        self.last_success = None
+        self._lock = asyncio.Lock()
+        self._device_connected = False
+        self._reconnect_at = 0.0
+        self._reconnect_backoff = Backoff(RECONNECT_MIN_DELAY, RECONNECT_MAX_DELAY)
+        self.circuit_breaker = CircuitBreaker(
+            CIRCUIT_BREAKER_FAILURES, Backoff(CIRCUIT_BREAKER_MIN_DELAY, CIRCUIT_BREAKER_MAX_DELAY)
+        )
+        if entry_id is not None:
+            suffix = f".{unit_id}" if unit_id != DEFAULT_UNIT_ID else ""
+            self._store = Store(hass, LAYOUT_STORAGE_VERSION, f"{LAYOUT_STORAGE_KEY}.{entry_id}{suffix}")
 
     async def async_initialize(self):
         try:
-            self.device = await self.hass.async_add_executor_job(self._create_device)
-            await self.async_scan()
+            await self._async_setup_transport()
+            await self._async_connect()
+            if not await self.async_load_layout():
+                await self.async_scan()
             _LOGGER.info("Successfully connected to SunSpec device at %s:%s", self.host, self.port)
         except Exception as e:
             _LOGGER.error("Failed to connect to SunSpec device at %s:%s: %s", self.host, self.port, str(e))
             raise
 
+    async def _async_setup_transport(self):
+        """Create the client of the configured transport, without connecting yet."""
+        if self.transport == TRANSPORT_NATIVE:
+            if self.client is None:
+                self.client = ModbusTcpClient(self.host, self.port, MODBUS_TIMEOUT, backoff=self._reconnect_backoff)
+        else:
+            self.device = await self._async_executor_job(self._create_device)
+
     def _create_device(self):
-        device = client.SunSpecModbusClientDeviceTCP(slave_id=1, ipaddr=self.host, ipport=self.port)
+        # pysunspec2 loads its model definitions on import, so it is only imported in the executor
+        import sunspec2.modbus.client as client
+
+        device = client.SunSpecModbusClientDeviceTCP(slave_id=self.unit_id, ipaddr=self.host, ipport=self.port)
         return device
 
+    @property
+    def connected(self) -> bool:
+        """Return True if a transport to the device has been set up."""
+        return self.client is not None or self.device is not None
+
+    async def async_close(self):
+        """Close the connection to the device."""
+        if self.capture is not None:
+            await self._async_flush_capture()
+        if self.client is not None and not self._shared_client:
+            await self.client.async_close()
+        if self.device is not None:
+            self._device_connected = False
+            await self._async_executor_job(self.device.close)
+
+    async def _async_connect(self):
+        """Make sure the persistent connection is open, backing off between failed attempts.
+
+        The native client applies the backoff itself, so it also holds for
+        writes and proxied requests on the same connection.
+        """
+        if self.client is not None:
+            if self.client.connected:
+                return
+            await self.client.async_connect()
+        else:
+            if self._device_connected:
+                return
+            now = time.monotonic()
+            if now < self._reconnect_at:
+                raise ModbusReconnectPending(
+                    f"Waiting {self._reconnect_at - now:.1f} s before reconnecting to {self.host}:{self.port}"
+                )
+            try:
+                await self._async_executor_job(self.device.connect)
+            except Exception as e:
+                self._reconnect_at = time.monotonic() + self._reconnect_backoff.next_delay()
+                raise HomeAssistantError(f"Unable to connect to {self.host}:{self.port}: {str(e)}") from e
+            self._device_connected = True
+            self._reconnect_backoff.reset()
+            self._reconnect_at = 0.0
+
+        if self.last_success is not None:
+            self.metrics.reconnects += 1
+            _LOGGER.info("Reconnected to SunSpec device at %s:%s", self.host, self.port)
+
+    async def _async_disconnect(self):
+        """Drop a connection that is in an unknown state, so the next poll reconnects."""
+        if self.client is not None:
+            # Late responses on a shared connection are discarded by transaction ID, the other units keep using it
+            if not self._shared_client:
+                await self.client.async_close()
+        elif self._device_connected:
+            self._device_connected = False
+            await self._async_executor_job(self.device.disconnect)
+
+    async def _async_executor_job(self, target, *args):
+        """Run a blocking call in the executor, accounting the time spent waiting for it."""
+        start = time.perf_counter()
+        try:
+            return await self.hass.async_add_executor_job(target, *args)
+        finally:
+            self.metrics.executor_time += time.perf_counter() - start
+
+    async def _async_read_registers(self, addr: int, count: int) -> bytes:
+        """Read raw holding registers over the configured transport."""
+        if self.client is None:
+            self.metrics.record_read(count)
+            return await self._async_executor_job(self.device.read, addr, count)
+
+        data = bytearray()
+        while count > 0:
+            chunk = min(count, MAX_READ_COUNT)
+            self.metrics.record_read(chunk)
+            data += await self.client.async_read_holding_registers(addr, chunk, self.unit_id)
+            addr += chunk
+            count -= chunk
+        return bytes(data)
+
+    async def _async_write_registers(self, addr: int, data: bytes) -> None:
+        """Write raw holding registers over the configured transport."""
+        self.metrics.record_write()
+        if self.client is None:
+            await self._async_executor_job(self.device.write, addr, data)
+        else:
+            await self.client.async_write_registers(addr, data, self.unit_id)
+
     async def async_scan(self):
-        """Perform a scan of the device and retrieve data using get_json()."""
-        if not self.device:
+        """Discover the model layout of the device with a full SunSpec scan."""
+        if not self.connected:
             _LOGGER.error("No connection to SunSpec device")
             raise HomeAssistantError("No connection to SunSpec device")
 
+        _LOGGER.debug("Starting device scan")
+        self.metrics.scans += 1
+        self.layout = None
+        self.models = {}
+        self._layout_saved = False
+        if self.client is not None:
+            self.base_addr, layout = await self._async_discover_layout()
+            self.models = await self._async_create_models(layout)
+        else:
+            await self._async_executor_job(self._scan)
+            self.base_addr = self.device.base_addr
+            layout = []
+            for model in self.device.model_list:
+                layout.append((model.model_id, model.model_addr, model.model_len))
+                if model.model_id in self.model_ids and model.model_id not in self.models:
+                    self.models[model.model_id] = model
+        self.layout = layout
+        self._update_read_plan()
+        _LOGGER.debug("Scan completed. Model layout (id, address, length): %s", layout)
+
+        missing = [model_id for model_id in self.model_ids if model_id not in self.models]
+        if missing:
+            _LOGGER.warning("SunSpec device at %s:%s does not provide models %s", self.host, self.port, missing)
+
+        return self.layout
+
+    def _scan(self):
+        # Scan on the persistent connection, pysunspec2 would otherwise open its own and close it afterwards
+        self.device.scan(connect=False)
+
+    async def _async_discover_layout(self):
+        """Walk the SunSpec model headers and return the base address and layout."""
+        for base_addr in SUNSPEC_BASE_ADDRESSES:
+            try:
+                if await self._async_read_registers(base_addr, 2) == SUNSPEC_MARKER:
+                    break
+            except ModbusExceptionResponse:
+                continue
+        else:
+            raise HomeAssistantError(f"No SunSpec device found at {self.host}:{self.port}")
+
+        layout = []
+        addr = base_addr + 2
+        while addr < 0xFFFF:
+            try:
+                model_id, model_len = struct.unpack(">HH", await self._async_read_registers(addr, 2))
+            except ModbusExceptionResponse:
+                # Some devices do not supply a length register after the end marker
+                model_id, = struct.unpack(">H", await self._async_read_registers(addr, 1))
+                if model_id != SUNSPEC_END_MODEL_ID:
+                    raise
+            if model_id == SUNSPEC_END_MODEL_ID:
+                return base_addr, layout
+            layout.append((model_id, addr, model_len))
+            addr += model_len + 2
+
+        raise HomeAssistantError(f"No SunSpec end model found at {self.host}:{self.port}")
+
+    async def _async_create_models(self, layout):
+        """Create the models, in the executor only if pysunspec2 models are needed."""
+        # pysunspec2 models are built from their registers, header included
+        model_data = {}
+        for model_id, model_addr, model_len in layout:
+            if model_id in self.model_ids and model_id not in MODEL_POINTS and model_id not in model_data:
+                model_data[model_id] = await self._async_read_registers(model_addr, model_len + 2)
+        if self.device is None and not model_data:
+            return self._create_models(layout, model_data)
+        return await self._async_executor_job(self._create_models, layout, model_data)
+
+    def _create_models(self, layout, model_data):
+        """Create the models used to decode the polled register ranges.
+
+        Models with a known register layout are decoded by the fast decoder,
+        pysunspec2 models are only created for the others, from the registers
+        read for them.
+        """
+        if self.device is not None:
+            self.device.models = {}
+            self.device.model_list = []
+
+        models = {}
+        for model_id, model_addr, model_len in layout:
+            if model_id not in self.model_ids or model_id in models:
+                continue
+            if model_id in MODEL_POINTS:
+                models[model_id] = ModelLayout(model_id, model_addr, model_len)
+                continue
+            import sunspec2.modbus.client as client
+
+            model = client.SunSpecModbusClientModel(
+                model_id=model_id,
+                model_addr=model_addr,
+                model_len=model_len,
+                data=model_data[model_id],
+                mb_device=self.device,
+            )
+            if self.device is not None:
+                self.device.add_model(model)
+            models[model_id] = model
+        return models
+
+    async def async_load_layout(self) -> bool:
+        """Restore the model layout from storage if the device still matches it."""
+        if self._store is None:
+            return False
+
+        cached = await self._store.async_load()
+        if (
+            not cached
+            or cached.get("host") != self.host
+            or cached.get("port") != self.port
+            or cached.get("unit_id", DEFAULT_UNIT_ID) != self.unit_id
+        ):
+            return False
+
         try:
-            _LOGGER.debug("Starting device scan")
-            await self.hass.async_add_executor_job(self.device.scan)
-            _LOGGER.debug("Scan completed. Retrieving JSON data")
-            
-            json_data = await self.hass.async_add_executor_job(self.device.get_json, True)
-            _LOGGER.debug("JSON data retrieved: %s", json_data)
-            
-            if not json_data:
-                _LOGGER.error("Device returned empty JSON data")
-                return {}
-
-            data = json.loads(json_data)
-
-            return data
+            layout = [tuple(model) for model in cached["models"]]
+            common = next(model for model in layout if model[0] == MODEL_COMMON)
+            base_addr = cached["base_addr"]
+            # One read covering the SunS marker, the common model header and its body
+            count = common[1] - base_addr + common[2] + 2
+            data = await self._async_read_registers(base_addr, count)
         except Exception as e:
-            _LOGGER.exception("Error scanning device and retrieving JSON: %s", str(e))
-            return {}
+            _LOGGER.debug("Cached model layout could not be verified: %s", str(e))
+            return False
 
-    async def async_read_data(self):
-        """Read current data from the device."""
-        if not self.device:
-            _LOGGER.error("No connection to SunSpec device")
-            raise HomeAssistantError("No connection to SunSpec device")
+        common_data = data[(common[1] - base_addr) * 2:]
+        if (
+            data[:4] != SUNSPEC_MARKER
+            or int.from_bytes(common_data[0:2], "big") != MODEL_COMMON
+            or int.from_bytes(common_data[2:4], "big") != common[2]
+            or _decode_string(common_data, COMMON_SN_OFFSET, COMMON_SN_LEN) != cached.get("serial_number")
+            or _decode_string(common_data, COMMON_VR_OFFSET, COMMON_VR_LEN) != cached.get("firmware_version")
+        ):
+            _LOGGER.debug("Cached model layout does not match the device, a full scan is required")
+            return False
+
+        if self.device is not None:
+            self.device.base_addr = base_addr
+        self.models = await self._async_create_models(layout)
+        self.base_addr = base_addr
+        self.layout = layout
+        self._update_read_plan()
+        self.serial_number = cached["serial_number"]
+        self.firmware_version = cached["firmware_version"]
+        self._layout_saved = True
+        _LOGGER.debug("Restored model layout from storage: %s", layout)
+        return True
+
+    async def _async_save_layout(self, data):
+        """Persist the discovered layout together with the device identity."""
+        for model in data["models"]:
+            if model.get("ID") == MODEL_COMMON:
+                self.serial_number = model.get("SN")
+
+        await self._store.async_save({
+            "host": self.host,
+            "port": self.port,
+            "unit_id": self.unit_id,
+            "serial_number": self.serial_number,
+            "firmware_version": self.firmware_version,
+            "base_addr": self.base_addr,
+            "models": [list(model) for model in self.layout],
+        })
+        self._layout_saved = True
+
+    async def async_remove_layout(self):
+        """Remove the persisted layout of this device."""
+        if self._store is not None:
+            await self._store.async_remove()
+
+    def _update_read_plan(self):
+        """Plan the coalesced block reads covering the polled models, per polling tier."""
+        self._tier_ranges = {tier: [] for tier in TIERS}
+        for model in self.models.values():
+            for tier, ranges in tier_ranges(model.model_id, model.model_addr, model.model_len).items():
+                self._tier_ranges[tier].extend(ranges)
+        self._read_plans = {}
+        self._decoded = {}
+        self._image_valid = False
+        full_plan = self._plan_for(TIERS)
+        self._image = RegisterImage.for_blocks(full_plan) if full_plan else None
+        self._apply_tier_lifetimes()
 
+    def set_tier_lifetimes(self, lifetimes: Mapping[str, float]) -> None:
+        """Set how long the registers of each polling tier stay fresh for cached reads."""
+        self.tier_lifetimes = dict(lifetimes)
+        self._apply_tier_lifetimes()
+
+    def _apply_tier_lifetimes(self):
+        """Store the lifetimes of the polling tiers in the register image."""
+        if self._image is None:
+            return
+        for tier, lifetime in self.tier_lifetimes.items():
+            for start, count in self._tier_ranges.get(tier, ()):
+                self._image.set_lifetime(start, count, lifetime)
+
+    def _plan_for(self, tiers):
+        """Return the read plan covering the given polling tiers."""
+        tiers = frozenset(tiers)
+        plan = self._read_plans.get(tiers)
+        if plan is None:
+            plan = plan_reads(
+                [register_range for tier in tiers for register_range in self._tier_ranges[tier]]
+            )
+            self._read_plans[tiers] = plan
+            if _LOGGER.isEnabledFor(logging.DEBUG):
+                _LOGGER.debug(
+                    "Read plan for %s:%s (%s): %s", self.host, self.port, ", ".join(sorted(tiers)), format_plan(plan)
+                )
+        return plan
+
+    def _read_blocks(self, blocks):
+        """Read planned blocks with the blocking pysunspec2 client."""
+        for block in blocks:
+            self.metrics.record_read(block.count)
+        return [self.device.read(block.start, block.count) for block in blocks]
+
+    async def _async_read_blocks(self, blocks):
+        """Read planned blocks, on the event loop when the native transport is used."""
+        if self.client is None:
+            return await self._async_executor_job(self._read_blocks, blocks)
+        data = []
+        for block in blocks:
+            self.metrics.record_read(block.count)
+            data.append(await self.client.async_read_holding_registers(block.start, block.count, self.unit_id))
+        return data
+
+    async def _async_poll(self, tiers=TIERS):
+        """Read the planned register blocks of the given tiers and decode the polled models."""
+        if self._image is None:
+            return {"models": []}
+
+        if self.client is not None and self.client.connection_count != self._connection_count:
+            # Static data is re-read whenever the connection was re-established
+            self._connection_count = self.client.connection_count
+            self._image_valid = False
+        if not self._image_valid:
+            tiers = TIERS
+
+        plan = self._plan_for(tiers)
+        blocks = await self._async_read_blocks(plan)
+        read_at = time.monotonic()
+        start = time.perf_counter()
+        for block, raw in zip(plan, blocks):
+            self._image.update(block.start, raw, read_at)
+        if self.capture is not None:
+            self.capture.append(time.time(), [(block.start, raw) for block, raw in zip(plan, blocks)], self._keyframe)
+        self._image_valid = True
+        self.tiers_read = frozenset(tiers)
+
+        data = {"models": []}
+        for model_id in self.model_ids:
+            model = self.models.get(model_id)
+            if model is None:
+                continue
+            model_end = model.model_addr + model.model_len + 2
+            decoded = self._decoded.get(model_id)
+            # Models untouched by this poll, like the common model between slow polls, keep their decoded values
+            if decoded is None or any(block.start < model_end and block.end > model.model_addr for block in plan):
+                decoded = self._decode_model(model)
+            data["models"].append(decoded)
+        self.metrics.loop_time += time.perf_counter() - start
+        return data
+
+    def read_cached_registers(self, addr: int, count: int, max_age: float) -> Optional[bytes]:
+        """Return registers of the last polls, or None if any is older than max_age and its tier lifetime."""
+        if self._image is None or not self._image_valid:
+            return None
+        return self._image.read_fresh(addr, count, time.monotonic(), max_age)
+
+    def invalidate_registers(self, addr: int, count: int) -> None:
+        """Drop cached registers that were written to the device."""
+        if self._image is not None:
+            self._image.invalidate(addr, count)
+
+    def _decode_model(self, model):
+        """Decode a model from the register image and cache the result."""
+        raw = self._image.read(model.model_addr, model.model_len + 2)
+        decoder = get_decoder(model.model_id, model.model_len)
+        if decoder is not None:
+            decoded = decoder.decode(raw)
+        else:
+            model.set_mb(data=raw, dirty=False)
+            decoded = model.get_dict(computed=True)
+        self._decoded[model.model_id] = decoded
+        return decoded
+
+    async def async_write_points(
+        self, model_id: int, values: Mapping[str, Any], priorities: Optional[Mapping[str, int]] = None
+    ) -> dict:
+        """Write point values and return the model with the values read back from the device.
+
+        Values are given as decoded, and scaled with the scale factors of the
+        last poll. The writes are queued and sent before the next poll; pending
+        writes to the same point are merged, so only the latest value is sent.
+        Nothing is queued unless every value can be encoded.
+        """
+        model = self.models.get(model_id)
+        decoded = self._decoded.get(model_id)
+        if model is None or decoded is None:
+            raise HomeAssistantError(f"Model {model_id} of {self.host}:{self.port} has not been read yet")
+
+        points = MODEL_POINTS[model_id]
+        writes = []
+        for name, value in values.items():
+            point = points.get(name)
+            if point is None:
+                raise HomeAssistantError(f"Model {model_id} has no point {name}")
+            try:
+                data = encode_point(point, value, decoded.get(point.sf) if point.sf else None)
+            except (OverflowError, TypeError, ValueError) as e:
+                raise HomeAssistantError(f"Invalid value {value} for {name}: {str(e)}") from e
+            writes.append((model.model_addr + point.offset, data, (priorities or {}).get(name, PRIORITY_NORMAL)))
+        futures = [self.commands.put(address, data, priority) for address, data, priority in writes]
+        async with self._lock:
+            await self._async_write_pending()
+        await asyncio.gather(*futures)
+        return self._decoded.get(model_id) or self._decode_model(model)
+
+    async def _async_write_pending(self):
+        """Send the queued writes, each followed by a read back of only the written registers."""
+        writes = self.commands.take()
+        if not writes:
+            return
+        try:
+            if not self.connected:
+                await self._async_setup_transport()
+            await self._async_connect()
+            for write in writes:
+                await self._async_write_registers(write.start, write.data)
+                raw = await self._async_read_registers(write.start, write.count)
+                self._update_registers(write.start, raw)
+                for future in write.futures:
+                    if not future.done():
+                        future.set_result(None)
+        except Exception as e:
+            if isinstance(e, (ModbusConnectionError, ModbusTimeoutError)):
+                if isinstance(e, ModbusTimeoutError):
+                    self.metrics.timeouts += 1
+                await self._async_disconnect()
+            if not isinstance(e, HomeAssistantError):
+                e = HomeAssistantError(f"Error writing to {self.host}:{self.port}: {str(e)}")
+            for write in writes:
+                for future in write.futures:
+                    if not future.done():
+                        future.set_exception(e)
+
+    def _update_registers(self, addr: int, data: bytes) -> None:
+        """Store registers read outside of a poll and drop the decoded models they belong to."""
+        if self._image is None:
+            return
+        try:
+            self._image.update(addr, data, time.monotonic())
+        except ValueError:
+            return
+        if self.capture is not None:
+            self.capture.append(time.time(), [(addr, data)], self._keyframe)
+        end = addr + len(data) // 2
+        for model in self.models.values():
+            if model.model_addr < end and model.model_addr + model.model_len + 2 > addr:
+                self._decoded.pop(model.model_id, None)
+
+    def _keyframe(self):
+        """Return the blocks that make a capture file replayable on its own: layout and register image."""
+        blocks = [(self.base_addr, SUNSPEC_MARKER)]
+        end = self.base_addr + 2
+        for model_id, model_addr, model_len in self.layout:
+            blocks.append((model_addr, struct.pack(">HH", model_id, model_len)))
+            end = model_addr + model_len + 2
+        blocks.append((end, struct.pack(">HH", SUNSPEC_END_MODEL_ID, 0)))
+        blocks.append((self._image.start, self._image.read(self._image.start, self._image.count)))
+        return blocks
+
+    async def _async_flush_capture(self):
+        """Write the buffered capture records in the executor."""
+        self._capture_flushed = time.monotonic()
+        pending = self.capture.take()
+        if pending:
+            try:
+                await self._async_executor_job(self.capture.write, pending)
+            except OSError as e:
+                _LOGGER.warning("Unable to write capture %s: %s", self.capture.path, str(e))
+
+    async def async_read_data(self, tiers=TIERS):
+        """Read current data from the device, refreshing the registers of the given polling tiers.
+
+        The transport is set up and the model layout restored or scanned on
+        the first call, so setup does not have to wait for the device.
+        """
+        async with self._lock:
+            return await self._async_read_data(tiers)
+
+    async def _async_read_data(self, tiers):
+        breaker = self.circuit_breaker
+        if not breaker.allow_request(time.monotonic()):
+            raise HomeAssistantError(
+                f"Polling of {self.host}:{self.port} paused after {breaker.consecutive_failures} failures, "
+                f"next attempt in {breaker.retry_at - time.monotonic():.0f} s"
+            )
+
+        self.metrics.begin_poll()
+        start = time.perf_counter()
+        try:
+            if not self.connected:
+                await self._async_setup_transport()
+            await self._async_connect()
+            if breaker.state == STATE_HALF_OPEN:
+                # Probe with a single register before resuming full polls
+                await self._async_read_registers(
+                    self.base_addr if self.base_addr is not None else SUNSPEC_BASE_ADDRESSES[0], 1
+                )
+            # Control writes go ahead of the poll
+            await self._async_write_pending()
+            data = await self._async_read_models(tiers)
+
+            if self._firmware_changed(data):
+                _LOGGER.info("Firmware version change detected on %s:%s, rescanning device", self.host, self.port)
+                await self.async_scan()
+                data = await self._async_poll()
+                self._firmware_changed(data)
+        except Exception as e:
+            self.metrics.end_poll(time.perf_counter() - start, False)
+            # A reconnect refused by the backoff made no attempt, so it does not count as a failure
+            if not isinstance(e, ModbusReconnectPending) and breaker.record_failure(time.monotonic(), e):
+                _LOGGER.warning(
+                    "Pausing polling of %s:%s for %.0f s after %s consecutive failures: %s",
+                    self.host,
+                    self.port,
+                    breaker.retry_at - time.monotonic(),
+                    breaker.consecutive_failures,
+                    str(e),
+                )
+            if isinstance(e, HomeAssistantError):
+                raise
+            raise HomeAssistantError(f"Error reading data: {str(e)}") from e
+
+        self.metrics.end_poll(time.perf_counter() - start, True)
+        breaker.record_success()
+        self.last_success = dt_util.utcnow()
+
+        if self._store is not None and not self._layout_saved:
+            await self._async_save_layout(data)
+
+        if self.capture is not None and (
+            self.capture.pending_bytes >= CAPTURE_FLUSH_BYTES
+            or time.monotonic() - self._capture_flushed >= CAPTURE_FLUSH_INTERVAL
+        ):
+            await self._async_flush_capture()
+
+        return data
+
+    async def _async_read_models(self, tiers):
+        """Poll the models, rescanning the device once if the layout no longer matches."""
         try:
-            # We'll perform a new scan each time to get the most current data
-            return await self.async_scan()
+            if self.layout is None and not await self.async_load_layout():
+                await self.async_scan()
+            return await self._async_poll(tiers)
+        except (ModbusConnectionError, ModbusTimeoutError) as e:
+            # A transport failure says nothing about the layout, reconnect on the next poll instead
+            _LOGGER.debug("Connection to %s:%s failed: %s", self.host, self.port, str(e))
+            if isinstance(e, ModbusTimeoutError):
+                self.metrics.timeouts += 1
+            await self._async_disconnect()
+            raise
         except Exception as e:
-            _LOGGER.exception("Error reading data: %s", str(e))
-            raise HomeAssistantError(f"Error reading data: {str(e)}")
+            _LOGGER.warning("Error reading SunSpec models, rescanning device: %s", str(e))
+
+        try:
+            if self.client is None:
+                await self._async_disconnect()
+                await self._async_connect()
+            await self.async_scan()
+            return await self._async_poll()
+        except Exception:
+            self.layout = None
+            raise
+
+    @property
+    def health(self) -> dict:
+        """Return the connection health of the device."""
+        breaker = self.circuit_breaker
+        return {
+            "unit_id": self.unit_id,
+            "connected": self.client.connected if self.client is not None else self._device_connected,
+            "circuit_breaker": breaker.state,
+            "consecutive_failures": breaker.consecutive_failures,
+            "last_error": breaker.last_error,
+            "last_success": self.last_success.isoformat() if self.last_success else None,
+            "reconnects": self.metrics.reconnects,
+        }
+
+    def _firmware_changed(self, data):
+        """Track the firmware version from the common model and report changes."""
+        for model in data["models"]:
+            if model.get("ID") == MODEL_COMMON:
+                version = model.get("Vr")
+                changed = self.firmware_version is not None and version != self.firmware_version
+                self.firmware_version = version
+                return changed
+        return False
 
     async def async_get_debug_data(self):
         data = await self.async_read_data()
-        return json.dumps(data, indent=2) if data else None
\ No newline at end of file
+        return json.dumps(data, indent=2) if data else None
@@ -0,0 +1,219 @@
+"""Polling benchmark for SunSpecReader and PixiiHomeDataCoordinator.
+
+Runs the reader and the coordinator against the local SunSpec simulator and
+reports per poll wall time, Modbus round trips, registers transferred, CPU
+time and allocations for the cold-start scan and for steady-state polls.
+
+Run from the repository root, with Home Assistant installed:
+
+    python -m tools.benchmark --polls 200 --latency 0.005
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import statistics
+import tempfile
+import threading
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Awaitable, Callable
+
+from homeassistant.core import HomeAssistant
+
+from custom_components.pixii_home.const import (
+    CONF_POLL_INTERVAL,
+    TIER_FAST,
+    TIERS,
+    TRANSPORT_NATIVE,
+    TRANSPORT_PYSUNSPEC2,
+)
+from custom_components.pixii_home.coordinator import PixiiHomeDataCoordinator
+from custom_components.pixii_home.decoder import get_decoder
+from custom_components.pixii_home.sunspec_models import MODEL_POINTS, encode_model
+from custom_components.pixii_home.sunspec_reader import SunSpecReader
+
+from .sunspec_simulator import DEFAULT_DUMP, SunSpecSimulator
+
+class Measurement:
+    """Cost of one measured operation."""
+
+    __slots__ = ("wall", "cpu", "requests", "registers", "alloc")
+
+    def __init__(self, wall: float, cpu: float, requests: int, registers: int, alloc: int):
+        """Initialize."""
+        self.wall = wall
+        self.cpu = cpu
+        self.requests = requests
+        self.registers = registers
+        self.alloc = alloc
+
+class SimulatorThread(threading.Thread):
+    """Run the simulator on its own event loop, so it does not count as loop CPU time."""
+
+    def __init__(self, simulator: SunSpecSimulator):
+        """Initialize."""
+        super().__init__(daemon=True)
+        self.simulator = simulator
+        self.loop = asyncio.new_event_loop()
+        self._ready = threading.Event()
+
+    def run(self) -> None:
+        asyncio.set_event_loop(self.loop)
+        self.loop.run_until_complete(self.simulator.async_start())
+        self._ready.set()
+        self.loop.run_forever()
+
+    def start_and_wait(self) -> int:
+        """Start the thread and return the port of the simulator."""
+        self.start()
+        self._ready.wait()
+        return self.simulator.port
+
+    def stop(self) -> None:
+        asyncio.run_coroutine_threadsafe(self.simulator.async_stop(), self.loop).result()
+        self.loop.call_soon_threadsafe(self.loop.stop)
+
+async def _async_measure(simulator: SunSpecSimulator, func: Callable[[], Awaitable]) -> Measurement:
+    """Measure one call: wall time, CPU time of the event loop thread and peak allocations."""
+    simulator.stats.reset()
+    tracemalloc.reset_peak()
+    baseline = tracemalloc.get_traced_memory()[0]
+    wall = time.perf_counter()
+    cpu = time.thread_time()
+    await func()
+    cpu = time.thread_time() - cpu
+    wall = time.perf_counter() - wall
+    alloc = tracemalloc.get_traced_memory()[1] - baseline
+    return Measurement(wall, cpu, simulator.stats.requests, simulator.stats.registers, alloc)
+
+def _percentile(values: list[float], percentile: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(percentile / 100 * (len(ordered) - 1))))]
+
+def _report(name: str, measurements: list[Measurement]) -> None:
+    """Print median, p95 and maximum of each metric."""
+    print(f"\n{name} ({len(measurements)} runs)")
+    print(f"  {'metric':<18}{'median':>12}{'p95':>12}{'max':>12}")
+    for metric, unit, scale in (
+        ("wall", "ms", 1000),
+        ("cpu", "ms", 1000),
+        ("requests", "", 1),
+        ("registers", "", 1),
+        ("alloc", "KiB", 1 / 1024),
+    ):
+        values = [getattr(measurement, metric) * scale for measurement in measurements]
+        label = f"{metric} [{unit}]" if unit else metric
+        print(
+            f"  {label:<18}{statistics.median(values):>12.2f}"
+            f"{_percentile(values, 95):>12.2f}{max(values):>12.2f}"
+        )
+
+def _benchmark_decode(dump: Path, runs: int) -> None:
+    """Compare the fast decoder with the pysunspec2 model decoding for each known model."""
+    import sunspec2.modbus.client as client
+
+    with open(dump, encoding="utf-8") as file:
+        models = [model for model in json.load(file)["models"] if model["ID"] in MODEL_POINTS]
+
+    print(f"\nDecode per model ({runs} runs)")
+    print(f"  {'model':<18}{'fast [us]':>12}{'pysunspec2 [us]':>18}{'speedup':>10}")
+    for model in models:
+        data = encode_model(model["ID"], model, model["L"])
+        decoder = get_decoder(model["ID"], model["L"])
+        sunspec_model = client.SunSpecModbusClientModel(
+            model_id=model["ID"], model_addr=40000, model_len=model["L"], data=data, mb_device=None
+        )
+
+        def pysunspec2_decode():
+            sunspec_model.set_mb(data=data, dirty=False)
+            return sunspec_model.get_dict(computed=True)
+
+        fast = min(_time_calls(lambda: decoder.decode(data), runs) for _ in range(3))
+        slow = min(_time_calls(pysunspec2_decode, runs) for _ in range(3))
+        print(f"  {model['ID']:<18}{fast * 1e6:>12.1f}{slow * 1e6:>18.1f}{slow / fast:>9.1f}x")
+
+def _time_calls(func: Callable[[], object], runs: int) -> float:
+    start = time.thread_time()
+    for _ in range(runs):
+        func()
+    return (time.thread_time() - start) / runs
+
+def _create_hass(config_dir: str) -> HomeAssistant:
+    try:
+        return HomeAssistant(config_dir)
+    except TypeError:
+        # Home Assistant releases before 2023.9 take no config directory argument
+        hass = HomeAssistant()
+        hass.config.config_dir = config_dir
+        return hass
+
+async def _async_benchmark(args: argparse.Namespace) -> None:
+    _benchmark_decode(args.dump, args.polls)
+
+    simulator = SunSpecSimulator.from_file(
+        args.dump, latency=args.latency, jitter=args.jitter, dynamic=True
+    )
+    simulator_thread = SimulatorThread(simulator)
+    port = simulator_thread.start_and_wait()
+
+    with tempfile.TemporaryDirectory() as config_dir:
+        hass = _create_hass(config_dir)
+        tracemalloc.start()
+        try:
+            cold_starts = []
+            for _ in range(args.cold_starts):
+                reader = SunSpecReader(hass, "127.0.0.1", port, transport=args.transport)
+
+                async def cold_start(reader=reader):
+                    await reader.async_initialize()
+                    await reader.async_read_data(TIERS)
+
+                cold_starts.append(await _async_measure(simulator, cold_start))
+                await reader.async_close()
+            _report(f"Cold start: scan and first full read ({args.transport})", cold_starts)
+
+            reader = SunSpecReader(hass, "127.0.0.1", port, transport=args.transport)
+            await reader.async_initialize()
+            await reader.async_read_data(TIERS)
+
+            reader_polls = [
+                await _async_measure(simulator, lambda: reader.async_read_data([TIER_FAST]))
+                for _ in range(args.polls)
+            ]
+            _report("SunSpecReader steady-state fast poll", reader_polls)
+
+            reader_full_polls = [
+                await _async_measure(simulator, lambda: reader.async_read_data(TIERS))
+                for _ in range(args.polls)
+            ]
+            _report("SunSpecReader steady-state poll of all tiers", reader_full_polls)
+
+            coordinator = PixiiHomeDataCoordinator(hass, reader, {CONF_POLL_INTERVAL: 1})
+            coordinator_polls = [
+                await _async_measure(simulator, coordinator.async_refresh)
+                for _ in range(args.polls)
+            ]
+            _report("PixiiHomeDataCoordinator refresh", coordinator_polls)
+
+            await reader.async_close()
+        finally:
+            tracemalloc.stop()
+            await hass.async_stop(force=True)
+
+    simulator_thread.stop()
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--dump", type=Path, default=DEFAULT_DUMP, help="get_json dump to simulate")
+    parser.add_argument("--transport", choices=[TRANSPORT_NATIVE, TRANSPORT_PYSUNSPEC2], default=TRANSPORT_NATIVE)
+    parser.add_argument("--polls", type=int, default=100, help="steady-state polls per benchmark")
+    parser.add_argument("--cold-starts", type=int, default=5, help="cold starts to measure")
+    parser.add_argument("--latency", type=float, default=0.0, help="simulated response delay in seconds")
+    parser.add_argument("--jitter", type=float, default=0.0, help="random +/- variation of the delay")
+    asyncio.run(_async_benchmark(parser.parse_args()))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""Check of battery control writes against the local SunSpec simulator.
+
+Writes a valid and an out-of-range control value in one call and checks
+that the call fails without writing either of them, neither right away nor
+with the next poll, and that the valid value alone is then written and
+read back. Exits with a non-zero status if a check fails.
+
+Run from the repository root, with Home Assistant installed:
+
+    python -m tools.check_controls
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import sys
+import tempfile
+
+from homeassistant.exceptions import HomeAssistantError
+
+from custom_components.pixii_home.const import MODEL_BATTERY, TIERS, TRANSPORT_NATIVE, TRANSPORT_PYSUNSPEC2
+from custom_components.pixii_home.sunspec_reader import SunSpecReader
+
+from .benchmark import _create_hass
+from .sunspec_simulator import SunSpecSimulator
+
+def _battery(data: dict) -> dict:
+    return next(model for model in data["models"] if model["ID"] == MODEL_BATTERY)
+
+async def _async_check(transport: str) -> list[str]:
+    """Run the checks and return the failures."""
+    failures = []
+    simulator = SunSpecSimulator.from_file(dynamic=True)
+    await simulator.async_start()
+    with tempfile.TemporaryDirectory() as config_dir:
+        hass = _create_hass(config_dir)
+        reader = SunSpecReader(hass, "127.0.0.1", simulator.port, transport=transport)
+        try:
+            before = _battery(await reader.async_read_data(TIERS))
+            valid = 20 if before["SoCRsvMin"] != 20 else 25
+
+            try:
+                await reader.async_write_points(MODEL_BATTERY, {"SoCRsvMin": valid, "WChaRteMax": 10 ** 9})
+                failures.append("writing an out-of-range value did not fail")
+            except HomeAssistantError as err:
+                print(f"Out-of-range value refused: {err}")
+            except Exception as err:  # pylint: disable=broad-except
+                failures.append(f"writing an out-of-range value raised {err!r} instead of HomeAssistantError")
+            if len(reader.commands):
+                failures.append(f"{len(reader.commands)} writes left queued after the failed call")
+            after = _battery(await reader.async_read_data(TIERS))
+            for name in ("SoCRsvMin", "WChaRteMax"):
+                if after[name] != before[name]:
+                    failures.append(f"{name} changed from {before[name]} to {after[name]} after the failed call")
+
+            written = await reader.async_write_points(MODEL_BATTERY, {"SoCRsvMin": valid})
+            if written["SoCRsvMin"] != valid:
+                failures.append(f"SoCRsvMin read back as {written['SoCRsvMin']} instead of {valid}")
+            else:
+                print(f"Valid value written and read back: SoCRsvMin {valid}")
+        finally:
+            await reader.async_close()
+            await hass.async_stop(force=True)
+            await simulator.async_stop()
+    return failures
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--transport", choices=[TRANSPORT_NATIVE, TRANSPORT_PYSUNSPEC2], default=TRANSPORT_NATIVE)
+    failures = asyncio.run(_async_check(parser.parse_args().transport))
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    sys.exit(1 if failures else 0)
+
+if __name__ == "__main__":
+    main()
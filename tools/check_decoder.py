@@ -0,0 +1,99 @@
+"""Equivalence check of the fast decoder with pysunspec2.
+
+Decodes the models of a get_json dump that have a known register layout
+with both ModelDecoder and pysunspec2's get_dict(computed=True), for the
+dump values, for all points not implemented and for a register pattern
+that gives every point a distinct value, and reports any difference in
+value or type. Exits with a non-zero status if the decoders disagree.
+
+Run from the repository root, with Home Assistant installed:
+
+    python -m tools.check_decoder
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+from pathlib import Path
+from typing import Any
+
+from custom_components.pixii_home.decoder import get_decoder
+from custom_components.pixii_home.sunspec_models import (
+    MODEL_HEADER_LEN,
+    MODEL_POINTS,
+    NOT_IMPLEMENTED,
+    SIGNED_TYPES,
+    encode_model,
+)
+
+from .sunspec_simulator import DEFAULT_DUMP
+
+def _pattern(model_id: int, model_len: int) -> bytes:
+    """Encode a model with a distinct raw value in every point, negative for signed points.
+
+    Scale factors are kept small and strings readable, so a point read at
+    the wrong offset or with the wrong sign or width shows up as a difference.
+    """
+    data = bytearray(encode_model(model_id, {}, model_len))
+    for point in MODEL_POINTS[model_id].values():
+        if point.offset + point.size > model_len + MODEL_HEADER_LEN:
+            continue
+        if point.type == "string":
+            raw = point.name.encode("ascii").ljust(point.size * 2, b"\0")
+        elif point.type == "sunssf":
+            raw = ((point.offset % 5 - 2) & 0xFFFF).to_bytes(2, "big")
+        else:
+            bits = 16 * point.size
+            value = (point.offset * 0x0101 + 1) & ((1 << (bits - 1)) - 1)
+            if point.type in SIGNED_TYPES:
+                value |= 1 << (bits - 1)
+            if value == NOT_IMPLEMENTED[point.type]:
+                value += 1
+            raw = value.to_bytes(point.size * 2, "big")
+        data[point.offset * 2:(point.offset + point.size) * 2] = raw
+    return bytes(data)
+
+def _differences(fast: dict[str, Any], expected: dict[str, Any]) -> list[str]:
+    """Describe the points decoded differently, including values of another type."""
+    differences = []
+    for name in list(expected) + [name for name in fast if name not in expected]:
+        value, expected_value = fast.get(name), expected.get(name)
+        if value != expected_value or type(value) is not type(expected_value):
+            differences.append(f"{name}: {value!r} != {expected_value!r}")
+    return differences
+
+def check(dump: Path) -> int:
+    """Compare both decoders on every known model of the dump and return the number of differences."""
+    import sunspec2.modbus.client as client
+
+    with open(dump, encoding="utf-8") as file:
+        models = [model for model in json.load(file)["models"] if model["ID"] in MODEL_POINTS]
+
+    failures = 0
+    for model in models:
+        model_id, model_len = model["ID"], model["L"]
+        decoder = get_decoder(model_id, model_len)
+        variants = {
+            "dump": encode_model(model_id, model, model_len),
+            "not implemented": encode_model(model_id, {}, model_len),
+            "pattern": _pattern(model_id, model_len),
+        }
+        for variant, data in variants.items():
+            sunspec_model = client.SunSpecModbusClientModel(
+                model_id=model_id, model_addr=40000, model_len=model_len, data=data, mb_device=None
+            )
+            differences = _differences(decoder.decode(data), sunspec_model.get_dict(computed=True))
+            print(f"Model {model_id} ({variant}): {'ok' if not differences else f'{len(differences)} differences'}")
+            for difference in differences:
+                print(f"  {difference}")
+            failures += len(differences)
+    return failures
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--dump", type=Path, default=DEFAULT_DUMP, help="get_json dump holding the models to check")
+    sys.exit(1 if check(parser.parse_args().dump) else 0)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""Replay of a capture through SunSpecReader and PixiiHomeDataCoordinator.
+
+Feeds the raw register blocks recorded in capture mode back to the reader,
+at the pace they were recorded or as fast as possible, and reports the cost
+of decoding and refreshing the coordinator per poll, together with the size
+of the capture compared with get_json dumps of the same polls.
+
+Run from the repository root, with Home Assistant installed:
+
+    python -m tools.replay config/pixii_home_capture/<entry_id>_1.bin --realtime
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import tempfile
+import time
+from pathlib import Path
+
+from custom_components.pixii_home.capture import ReplayClient, capture_files
+from custom_components.pixii_home.const import CONF_POLL_INTERVAL, DEFAULT_POLL_INTERVAL
+from custom_components.pixii_home.coordinator import PixiiHomeDataCoordinator
+from custom_components.pixii_home.sunspec_reader import SunSpecReader
+
+from .benchmark import _create_hass, _percentile
+
+async def _async_replay(args: argparse.Namespace) -> None:
+    files = capture_files(str(args.capture))
+    if not files:
+        raise SystemExit(f"No capture found at {args.capture}")
+
+    client = ReplayClient(str(args.capture))
+    timestamp = client.advance()
+    if timestamp is None:
+        raise SystemExit(f"{args.capture} holds no polls")
+    with tempfile.TemporaryDirectory() as config_dir:
+        hass = _create_hass(config_dir)
+        try:
+            reader = SunSpecReader(hass, str(args.capture), 0, client=client)
+            coordinator = PixiiHomeDataCoordinator(hass, reader, {CONF_POLL_INTERVAL: args.poll_interval})
+            # Polling tiers, energy integration and samples follow the recorded time instead of the replay time
+            coordinator.clock = coordinator.wall_clock = lambda: client.timestamp
+
+            refresh_times = []
+            json_bytes = 0
+            first = previous = timestamp
+            start = time.perf_counter()
+            while timestamp is not None:
+                if args.realtime:
+                    await asyncio.sleep(max(timestamp - previous, 0))
+                    previous = timestamp
+                refresh_start = time.perf_counter()
+                await coordinator.async_refresh()
+                refresh_times.append(time.perf_counter() - refresh_start)
+                if coordinator.data is not None:
+                    json_bytes += len(json.dumps(
+                        {"models": [dict(model) for model in coordinator.data.models.values()]}, indent=2
+                    ))
+                last = timestamp
+                timestamp = client.advance()
+            wall = time.perf_counter() - start
+
+            await reader.async_close()
+        finally:
+            await hass.async_stop(force=True)
+
+    capture_bytes = sum(os.path.getsize(file) for file in files)
+    polls = len(refresh_times)
+    print(f"Replayed {polls} polls covering {last - first:.0f} s in {wall:.2f} s from {len(files)} files")
+    if refresh_times:
+        print(
+            f"Refresh [ms]: median {statistics.median(refresh_times) * 1000:.3f}, "
+            f"p95 {_percentile(refresh_times, 95) * 1000:.3f}, max {max(refresh_times) * 1000:.3f}"
+        )
+    print(f"Energy: {coordinator.energy.as_dict()}")
+    print(
+        f"Capture {capture_bytes} bytes, get_json dumps of the same polls {json_bytes} bytes "
+        f"({json_bytes / max(capture_bytes, 1):.1f}x)"
+    )
+    print(f"Metrics: {reader.metrics.summary()}")
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("capture", type=Path, help="capture file, rotated files next to it are included")
+    parser.add_argument("--realtime", action="store_true", help="replay at the pace the polls were recorded")
+    parser.add_argument("--poll-interval", type=int, default=DEFAULT_POLL_INTERVAL, help="fast poll interval of the capture")
+    asyncio.run(_async_replay(parser.parse_args()))
+
+if __name__ == "__main__":
+    main()
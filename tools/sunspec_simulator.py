@@ -0,0 +1,253 @@
+"""Local Modbus TCP server serving a simulated Pixii SunSpec register map.
+
+The register image is generated from a get_json dump such as
+pixii-sunspec.json. Latency, jitter, dropped connections and changing live
+values can be configured to reproduce the behaviour of a gateway on a site
+LAN.
+
+Run from the repository root:
+
+    python -m tools.sunspec_simulator --port 5020 --latency 0.02 --dynamic
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import logging
+import math
+import random
+import struct
+import time
+from pathlib import Path
+
+from custom_components.pixii_home.const import (
+    MODEL_BATTERY,
+    MODEL_INVERTER,
+    SUNSPEC_END_MODEL_ID,
+    SUNSPEC_MARKER,
+)
+from custom_components.pixii_home.sunspec_models import MODEL_POINTS, encode_model, encode_point
+
+_LOGGER = logging.getLogger(__name__)
+
+DEFAULT_DUMP = Path(__file__).resolve().parent.parent / "pixii-sunspec.json"
+
+MBAP_HEADER = struct.Struct(">HHHB")
+FUNC_READ_HOLDING_REGISTERS = 0x03
+FUNC_WRITE_SINGLE_REGISTER = 0x06
+FUNC_WRITE_MULTIPLE_REGISTERS = 0x10
+EXCEPTION_ILLEGAL_FUNCTION = 0x01
+EXCEPTION_ILLEGAL_ADDRESS = 0x02
+
+class SimulatorStats:
+    """Counters of the requests served by the simulator."""
+
+    def __init__(self):
+        """Initialize."""
+        self.reset()
+
+    def reset(self) -> None:
+        """Clear all counters."""
+        self.requests = 0
+        self.registers = 0
+        self.bytes_sent = 0
+        self.connections = 0
+        self.dropped = 0
+
+class SunSpecSimulator:
+    """Simulated SunSpec device behind a Modbus TCP server."""
+
+    def __init__(
+        self,
+        models: list[dict],
+        base_addr: int = 40000,
+        unit_id: int = 1,
+        latency: float = 0.0,
+        jitter: float = 0.0,
+        drop_rate: float = 0.0,
+        dynamic: bool = False,
+    ):
+        """Initialize."""
+        self.models = [dict(model) for model in models]
+        self.base_addr = base_addr
+        self.unit_id = unit_id
+        self.latency = latency
+        self.jitter = jitter
+        self.drop_rate = drop_rate
+        self.dynamic = dynamic
+        self.stats = SimulatorStats()
+        self._server: asyncio.AbstractServer | None = None
+        self._started = time.monotonic()
+        self._registers = bytearray()
+        self._model_addrs: dict[int, tuple[int, dict]] = {}
+        self._build_image()
+
+    @classmethod
+    def from_file(cls, path: Path = DEFAULT_DUMP, **kwargs) -> SunSpecSimulator:
+        """Create a simulator from a get_json dump of a device."""
+        with open(path, encoding="utf-8") as dump:
+            return cls(json.load(dump)["models"], **kwargs)
+
+    @property
+    def port(self) -> int:
+        """Return the port the server listens on."""
+        return self._server.sockets[0].getsockname()[1]
+
+    def _build_image(self) -> None:
+        """Encode all models into one register image starting at the base address."""
+        image = bytearray(SUNSPEC_MARKER)
+        for model in self.models:
+            model_id = model["ID"]
+            self._model_addrs[model_id] = (self.base_addr + len(image) // 2, model)
+            if model_id in MODEL_POINTS:
+                image += encode_model(model_id, model, model["L"])
+            else:
+                image += struct.pack(">HH", model_id, model["L"]) + bytes(model["L"] * 2)
+        image += struct.pack(">HH", SUNSPEC_END_MODEL_ID, 0)
+        self._registers = image
+
+    def _update_points(self, model_id: int, names: tuple[str, ...]) -> None:
+        """Re-encode the given points after their values changed, keeping registers written by clients."""
+        addr, model = self._model_addrs[model_id]
+        points = MODEL_POINTS[model_id]
+        for name in names:
+            point = points[name]
+            offset = (addr + point.offset - self.base_addr) * 2
+            self._registers[offset:offset + point.size * 2] = encode_point(
+                point, model[name], model.get(point.sf) if point.sf else None
+            )
+
+    def _evolve(self) -> None:
+        """Let the live values drift like a battery following a household load."""
+        elapsed = time.monotonic() - self._started
+        if MODEL_BATTERY in self._model_addrs:
+            battery = self._model_addrs[MODEL_BATTERY][1]
+            battery["W"] = round(2000 * math.sin(elapsed / 60) + random.uniform(-50, 50))
+            battery["SoC"] = round(min(max(50 + 40 * math.sin(elapsed / 3600), 0), 100), 1)
+            battery["Hb"] = (battery.get("Hb") or 0) + 1 & 0xFFFF
+            self._update_points(MODEL_BATTERY, ("W", "SoC", "Hb"))
+        if MODEL_INVERTER in self._model_addrs:
+            inverter = self._model_addrs[MODEL_INVERTER][1]
+            inverter["W"] = round(1500 * math.sin(elapsed / 60) + random.uniform(-20, 20), 1)
+            inverter["Hz"] = round(50 + random.uniform(-0.05, 0.05), 2)
+            for phase in ("AphA", "AphB", "AphC"):
+                inverter[phase] = round(max(abs(inverter["W"]) / 690 + random.uniform(-0.05, 0.05), 0), 3)
+            self._update_points(MODEL_INVERTER, ("W", "Hz", "AphA", "AphB", "AphC"))
+
+    def read_registers(self, addr: int, count: int) -> bytes | None:
+        """Return registers from the image, or None if the range is not mapped."""
+        offset = (addr - self.base_addr) * 2
+        if offset < 0 or offset + count * 2 > len(self._registers):
+            return None
+        return bytes(self._registers[offset:offset + count * 2])
+
+    def write_registers(self, addr: int, data: bytes) -> bool:
+        """Write registers into the image."""
+        offset = (addr - self.base_addr) * 2
+        if offset < 0 or offset + len(data) > len(self._registers):
+            return False
+        self._registers[offset:offset + len(data)] = data
+        return True
+
+    async def async_start(self, host: str = "127.0.0.1", port: int = 0) -> None:
+        """Start listening for Modbus TCP connections."""
+        self._server = await asyncio.start_server(self._handle_connection, host, port)
+        _LOGGER.info("SunSpec simulator listening on %s:%s", host, self.port)
+
+    async def async_stop(self) -> None:
+        """Stop the server."""
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+
+    async def _handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        """Serve requests of one client connection."""
+        self.stats.connections += 1
+        try:
+            while True:
+                transaction_id, _, length, unit_id = MBAP_HEADER.unpack(await reader.readexactly(MBAP_HEADER.size))
+                pdu = await reader.readexactly(length - 1)
+                if self.drop_rate and random.random() < self.drop_rate:
+                    self.stats.dropped += 1
+                    break
+                delay = self.latency + random.uniform(-self.jitter, self.jitter)
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                response = self._handle_pdu(unit_id, pdu)
+                if response is None:
+                    continue
+                writer.write(MBAP_HEADER.pack(transaction_id, 0, len(response) + 1, unit_id) + response)
+                await writer.drain()
+                self.stats.bytes_sent += MBAP_HEADER.size + len(response)
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    def _handle_pdu(self, unit_id: int, pdu: bytes) -> bytes | None:
+        """Return the response PDU of a request, or None for other unit IDs."""
+        if unit_id != self.unit_id:
+            return None
+        self.stats.requests += 1
+        function = pdu[0]
+        if function == FUNC_READ_HOLDING_REGISTERS:
+            addr, count = struct.unpack(">HH", pdu[1:5])
+            if self.dynamic:
+                self._evolve()
+            data = self.read_registers(addr, count) if 0 < count <= 125 else None
+            if data is None:
+                return bytes([function | 0x80, EXCEPTION_ILLEGAL_ADDRESS])
+            self.stats.registers += count
+            return bytes([function, len(data)]) + data
+        if function == FUNC_WRITE_SINGLE_REGISTER:
+            addr, = struct.unpack(">H", pdu[1:3])
+            if len(pdu) != 5 or not self.write_registers(addr, pdu[3:5]):
+                return bytes([function | 0x80, EXCEPTION_ILLEGAL_ADDRESS])
+            self.stats.registers += 1
+            return pdu
+        if function == FUNC_WRITE_MULTIPLE_REGISTERS:
+            addr, count, _ = struct.unpack(">HHB", pdu[1:6])
+            if not self.write_registers(addr, pdu[6:6 + count * 2]):
+                return bytes([function | 0x80, EXCEPTION_ILLEGAL_ADDRESS])
+            self.stats.registers += count
+            return pdu[:5]
+        return bytes([function | 0x80, EXCEPTION_ILLEGAL_FUNCTION])
+
+async def _async_main(args: argparse.Namespace) -> None:
+    simulator = SunSpecSimulator.from_file(
+        args.dump,
+        base_addr=args.base_addr,
+        unit_id=args.unit_id,
+        latency=args.latency,
+        jitter=args.jitter,
+        drop_rate=args.drop_rate,
+        dynamic=args.dynamic,
+    )
+    await simulator.async_start(args.host, args.port)
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await simulator.async_stop()
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--dump", type=Path, default=DEFAULT_DUMP, help="get_json dump to serve")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=5020)
+    parser.add_argument("--base-addr", type=int, default=40000)
+    parser.add_argument("--unit-id", type=int, default=1)
+    parser.add_argument("--latency", type=float, default=0.0, help="response delay in seconds")
+    parser.add_argument("--jitter", type=float, default=0.0, help="random +/- variation of the delay")
+    parser.add_argument("--drop-rate", type=float, default=0.0, help="probability of dropping the connection")
+    parser.add_argument("--dynamic", action="store_true", help="let live values change on every read")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+    try:
+        asyncio.run(_async_main(args))
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == "__main__":
+    main()